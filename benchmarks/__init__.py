@@ -0,0 +1 @@
+"""Benchmarks for the Internet Status integration."""
@@ -0,0 +1,237 @@
+"""
+Benchmark Internet Status coordinator update cycles.
+
+Links are probed against an in-process stand-in DNS server, so the benchmark
+needs no network access. For each number of links, the benchmark reports the
+wall clock latency of a coordinator update cycle, the CPU time spent by the
+event loop thread per cycle and per probe, the memory allocated per cycle,
+the longest time the event loop was blocked, and the ratio of probes that
+received no response.
+
+Loss well above the loss configured for the stand-in server means that
+probes timed out, for example because responses were dropped by the kernel,
+so the cycle times measure timeouts rather than the cost of a cycle. Such
+results are flagged as invalid, and the benchmark exits with an error.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_coordinator --sizes 1 10 100 1000
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+import argparse
+import asyncio
+import logging
+import math
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.internet_status.const import (
+    CONF_LINKS,
+    CONF_LINK_TYPE,
+    CONF_NAME,
+    CONF_PROBE_TARGET,
+    CONF_PROBE_TYPE,
+    CONF_RETRIES,
+    CONF_RTT_SENSOR,
+    CONF_SCAN_INTERVAL,
+    CONF_TIMEOUT,
+    LinkType,
+    ProbeType,
+)
+from custom_components.internet_status.coordinator import (
+    InternetLinks,
+    InternetStatusCoordinator,
+)
+from custom_components.internet_status.dns_probe import DNSProbeEngine
+
+from .stub_dns_server import StubDNSServer
+
+DNS_PROBE_TYPES = [ProbeType.GOOGLE, ProbeType.OPENDNS, ProbeType.AKAMAI]
+## Interval between event loop lag samples (s)
+LAG_INTERVAL = 0.001
+## Loss above the server loss by more than this many standard deviations,
+## plus the margin, invalidates a result
+LOSS_SIGMAS = 3
+LOSS_MARGIN = 0.01
+
+
+def make_options(size: int, host: str, args: argparse.Namespace) -> dict:
+    """Return integration options with the requested number of DNS links."""
+    links = []
+    for index in range(size):
+        links.append(
+            {
+                CONF_NAME: f"Link {index + 1}",
+                CONF_LINK_TYPE: LinkType.PRIMARY if index == 0 else args.link_type,
+                CONF_PROBE_TYPE: DNS_PROBE_TYPES[index % len(DNS_PROBE_TYPES)],
+                CONF_PROBE_TARGET: host,
+                CONF_SCAN_INTERVAL: 30,
+                CONF_TIMEOUT: args.timeout,
+                CONF_RETRIES: args.retries,
+                CONF_RTT_SENSOR: {},
+            }
+        )
+    return {CONF_LINKS: links}
+
+
+def loss_is_expected(loss: float, server_loss: float, probes: int) -> bool:
+    """Return whether the measured loss is explained by the server loss."""
+    sigma = math.sqrt(server_loss * (1 - server_loss) / max(probes, 1))
+    return loss <= server_loss + LOSS_SIGMAS * sigma + LOSS_MARGIN
+
+
+async def async_run_cycle(coordinator: InternetStatusCoordinator) -> None:
+    """Make every link due and run one update cycle, as the scheduler does."""
+    for link in coordinator.links.links_all.values():
+        link.next_update = 0.0
+    await coordinator.async_refresh_links(coordinator.links.links_all.values(), False)
+
+
+async def async_measure_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    """Record how late the event loop wakes up a periodic sleeper."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(time.perf_counter() - start - LAG_INTERVAL)
+
+
+async def async_bench_size(
+    hass: HomeAssistant, server: StubDNSServer, size: int, args: argparse.Namespace
+) -> dict:
+    """Benchmark coordinator update cycles for one number of links."""
+    dns_probe_engine = DNSProbeEngine(port=server.port)
+    links = InternetLinks(
+        make_options(size, server.host, args),
+        dns_probe_engine=dns_probe_engine,
+    )
+    entry = SimpleNamespace(entry_id=f"bench_{size}", title="Benchmark", options={})
+    coordinator = InternetStatusCoordinator(hass, entry, links)
+    await async_run_cycle(coordinator)  ## warm up
+
+    ## Latency and CPU time
+    latencies = []
+    cpu_times = []
+    queries = server.queries
+    for _ in range(args.cycles):
+        start_cpu = time.thread_time()
+        start = time.perf_counter()
+        await async_run_cycle(coordinator)
+        latencies.append(time.perf_counter() - start)
+        cpu_times.append(time.thread_time() - start_cpu)
+    probes = server.queries - queries
+
+    ## Event loop blocking
+    lags: list[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(async_measure_lag(stop, lags))
+    for _ in range(args.cycles):
+        await async_run_cycle(coordinator)
+    stop.set()
+    await lag_task
+
+    ## Allocations
+    tracemalloc.start()
+    allocated = []
+    for _ in range(args.cycles):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        await async_run_cycle(coordinator)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - base)
+    tracemalloc.stop()
+
+    loss = statistics.mean(
+        link.rtt_stats.loss or 0.0 for link in links.links_all.values()
+    )
+    await coordinator.async_shutdown()
+    dns_probe_engine.close()
+
+    latencies.sort()
+    return {
+        "links": size,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+        "cpu_ms": statistics.mean(cpu_times) * 1000,
+        "cpu_us_probe": sum(cpu_times) / max(probes, 1) * 1_000_000,
+        "alloc_kib": statistics.mean(allocated) / 1024,
+        "block_ms": max(lags, default=0.0) * 1000,
+        "loss": loss,
+        "valid": loss_is_expected(loss, args.loss, probes),
+    }
+
+
+def print_results(results: list[dict]) -> None:
+    """Print benchmark results as a table."""
+    print(
+        f"{'links':>6} {'p50 ms':>9} {'p95 ms':>9} {'cpu ms':>9} "
+        f"{'cpu us/probe':>13} {'alloc KiB':>10} {'block ms':>9} {'loss':>6}"
+    )
+    for result in results:
+        print(
+            f"{result['links']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['cpu_ms']:>9.2f} {result['cpu_us_probe']:>13.1f} "
+            f"{result['alloc_kib']:>10.1f} {result['block_ms']:>9.2f} "
+            f"{result['loss']:>6.1%}" + ("" if result["valid"] else "  INVALID")
+        )
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+    server = StubDNSServer(latency=args.latency, loss=args.loss)
+    server.start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        results = []
+        try:
+            for size in args.sizes:
+                results.append(await async_bench_size(hass, server, size, args))
+        finally:
+            server.stop()
+    print(
+        f"retries={args.retries}, timeout={args.timeout}s, "
+        f"latency={args.latency * 1000:g}ms, loss={args.loss:.0%}, "
+        f"cycles={args.cycles}"
+    )
+    print_results(results)
+    if not all(result["valid"] for result in results):
+        sys.exit(
+            "INVALID: loss exceeds the server loss, so probes timed out and cycle "
+            "times measure timeouts"
+        )
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 10, 100, 1000], help="link counts"
+    )
+    parser.add_argument("--cycles", type=int, default=20, help="cycles per phase")
+    parser.add_argument("--retries", type=int, default=1, help="probes per poll")
+    parser.add_argument("--timeout", type=float, default=1.0, help="probe timeout")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="server response delay (s)"
+    )
+    parser.add_argument(
+        "--loss", type=float, default=0.0, help="server response loss ratio"
+    )
+    parser.add_argument(
+        "--link-type",
+        default=LinkType.SECONDARY,
+        choices=[LinkType.SECONDARY, LinkType.MONITOR_ONLY],
+        help="type of links other than the primary link",
+    )
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""In-process stand-in for the DNS servers queried by Internet Status probes."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import socket
+import struct
+import threading
+
+QTYPE_A = 1
+QTYPE_TXT = 16
+QCLASS_IN = 1
+
+FLAGS_RESPONSE = 0x8180  ## QR, RD, RA
+FLAGS_NXDOMAIN = 0x8183
+
+_HEADER = struct.Struct("!HHHHHH")
+_RR = struct.Struct("!HHHIH")  ## name pointer, type, class, ttl, rdlength
+
+## Probe names answered by the server and the record type of the answer
+PROBE_QNAMES = {
+    "o-o.myaddr.l.google.com": QTYPE_TXT,
+    "myip.opendns.com": QTYPE_A,
+    "whoami.akamai.net": QTYPE_A,
+}
+
+
+def _parse_question(data: bytes) -> tuple[str, int, int]:
+    """Return the qname, qtype and end offset of the question in a query."""
+    labels = []
+    offset = _HEADER.size
+    while length := data[offset]:
+        labels.append(data[offset + 1 : offset + 1 + length].decode("ascii"))
+        offset += 1 + length
+    qtype = struct.unpack_from("!H", data, offset + 1)[0]
+    return ".".join(labels).lower(), qtype, offset + 5
+
+
+class StubDNSProtocol(asyncio.DatagramProtocol):
+    """Answer probe queries with the configured IP address."""
+
+    def __init__(self, server: StubDNSServer) -> None:
+        self.server = server
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        server = self.server
+        server.queries += 1
+        if server.loss and random.random() < server.loss:
+            server.dropped += 1
+            return
+        try:
+            response = server.build_response(data, addr)
+        except (IndexError, struct.error, UnicodeDecodeError):
+            return
+        if server.latency:
+            asyncio.get_running_loop().call_later(
+                server.latency, self.transport.sendto, response, addr
+            )
+        else:
+            self.transport.sendto(response, addr)
+
+
+class StubDNSServer:
+    """
+    Stand-in for the Google, OpenDNS and Akamai probe DNS servers.
+
+    The server runs on its own event loop in a background thread, so that its
+    CPU time is not counted against the event loop being measured. Responses
+    are delayed by latency seconds and dropped with probability loss. The IP
+    address returned can be set per probe name in response_ips, otherwise the
+    address of the client is echoed back.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        loss: float = 0.0,
+        response_ips: dict[str, str] | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.loss = loss
+        self.response_ips = response_ips or {}
+        self.queries = 0
+        self.dropped = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._transport: asyncio.DatagramTransport | None = None
+
+    def build_response(self, data: bytes, addr: tuple) -> bytes:
+        """Return the response to a probe query."""
+        txid, _, _, _, _, _ = _HEADER.unpack_from(data)
+        qname, qtype, end = _parse_question(data)
+        question = data[_HEADER.size : end]
+        if PROBE_QNAMES.get(qname) != qtype:
+            return _HEADER.pack(txid, FLAGS_NXDOMAIN, 1, 0, 0, 0) + question
+        address = self.response_ips.get(qname, addr[0])
+        if qtype == QTYPE_TXT:
+            text = address.encode("ascii")
+            rdata = bytes([len(text)]) + text
+        else:
+            rdata = socket.inet_aton(address)
+        return (
+            _HEADER.pack(txid, FLAGS_RESPONSE, 1, 1, 0, 0)
+            + question
+            + _RR.pack(0xC00C, qtype, QCLASS_IN, 0, len(rdata))
+            + rdata
+        )
+
+    def start(self) -> None:
+        """Start the server thread and wait until it is listening."""
+        started = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._transport, _ = self._loop.run_until_complete(
+                self._loop.create_datagram_endpoint(
+                    lambda: StubDNSProtocol(self), local_addr=(self.host, self.port)
+                )
+            )
+            self.port = self._transport.get_extra_info("sockname")[1]
+            started.set()
+            self._loop.run_forever()
+            self._transport.close()
+            self._loop.run_until_complete(asyncio.sleep(0))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="stub_dns", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self) -> None:
+        """Stop the server thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
@@ -3,44 +3,189 @@
 from __future__ import annotations
 
 import logging
+import os
 
-import dns.rdata
-import dns.rdataclass
-import dns.rdatatype
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant, ServiceCall
-
-from .const import DOMAIN
-from .coordinator import InternetStatusCoordinator, InternetLinks
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.storage import STORAGE_DIR
+from homeassistant.helpers.typing import ConfigType
+
+from .const import (
+    DOMAIN,
+    DATA_DNS_PROBE_ENGINE,
+    DATA_REVERSE_LOOKUP_CACHE,
+    DATA_PROBE_HUB,
+    CONF_HISTORY_SIZE,
+    DEFAULTS,
+    STORAGE_KEY,
+    SERVICE_EXPORT_HISTORY,
+    ATTR_START,
+    ATTR_END,
+    DEF_HISTORY_FILENAME,
+    SERVICE_PROFILE,
+    ATTR_CYCLES,
+    ATTR_FILENAME,
+    ATTR_CONFIG_ENTRY_ID,
+    DEF_PROFILE_CYCLES,
+    DEF_PROFILE_FILENAME,
+)
+from .coordinator import InternetStatusCoordinator, InternetLinks, link_state_store
+from .dns_probe import DNSProbeEngine
+from .history import RttHistory
+from .probe_hub import ProbeHub
 
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BINARY_SENSOR]
 
+HISTORY_FILENAME = STORAGE_KEY + ".{}.history"
+
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CYCLES, default=DEF_PROFILE_CYCLES): cv.positive_int,
+        vol.Optional(ATTR_FILENAME, default=DEF_PROFILE_FILENAME): cv.string,
+    }
+)
+
+EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_FILENAME, default=DEF_HISTORY_FILENAME): cv.string,
+    }
+)
+
+
+def remove_history(path: str) -> None:
+    """Remove a history file, if present. (blocking)"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_coordinator(
+    hass: HomeAssistant, service_call: ServiceCall
+) -> InternetStatusCoordinator:
+    """
+    Return the coordinator of the config entry targeted by a service call.
+
+    The config entry may be omitted if only one entry is loaded.
+    """
+    coordinators = {
+        entry_id: coordinator
+        for entry_id, coordinator in hass.data.get(DOMAIN, {}).items()
+        if isinstance(coordinator, InternetStatusCoordinator)
+    }
+    if (entry_id := service_call.data.get(ATTR_CONFIG_ENTRY_ID)) is None:
+        if len(coordinators) == 1:
+            return next(iter(coordinators.values()))
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="config_entry_required",
+        )
+    if (coordinator := coordinators.get(entry_id)) is None:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="config_entry_not_loaded",
+            translation_placeholders={"config_entry_id": entry_id},
+        )
+    return coordinator
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the internet_status services."""
+
+    async def async_profile(service_call: ServiceCall) -> None:
+        """Profile the next update cycles."""
+        _LOGGER.debug("profile(%s)", service_call.data)
+        get_coordinator(hass, service_call).async_start_profile(
+            service_call.data[ATTR_CYCLES],
+            hass.config.path(service_call.data[ATTR_FILENAME]),
+        )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
+
+    async def async_export_history(service_call: ServiceCall) -> None:
+        """Export the RTT history to a CSV file."""
+        _LOGGER.debug("export_history(%s)", service_call.data)
+        await get_coordinator(hass, service_call).async_export_history(
+            hass.config.path(service_call.data[ATTR_FILENAME]),
+            service_call.data.get(ATTR_START),
+            service_call.data.get(ATTR_END),
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        async_export_history,
+        schema=EXPORT_HISTORY_SCHEMA,
+    )
+
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up internet_status from a config entry."""
 
     def setup_links():
-        """Set up Internet links synchronously via executor job."""
-        ## https://github.com/rthalley/dnspython/issues/1083
-        ## https://github.com/rthalley/dnspython/pull/1095
-        for rdtype in dns.rdatatype.RdataType:
-            if not dns.rdatatype.is_metatype(rdtype) or rdtype == dns.rdatatype.OPT:
-                dns.rdata.get_rdata_class(dns.rdataclass.IN, rdtype)
-
-        return InternetLinks(entry.options)
+        """
+        Set up Internet links synchronously via executor job.
+
+        Probe backends are loaded only for the configured probe types, eg.
+        dnspython is imported only when a link uses reverse DNS lookups.
+        """
+        return InternetLinks(
+            entry.options,
+            dns_probe_engine=dns_probe_engine,
+            reverse_lookup_cache=hass.data[DOMAIN].get(DATA_REVERSE_LOOKUP_CACHE),
+            probe_hub=probe_hub,
+        )
 
     hass.data.setdefault(DOMAIN, {})
+    if (dns_probe_engine := hass.data[DOMAIN].get(DATA_DNS_PROBE_ENGINE)) is None:
+        dns_probe_engine = hass.data[DOMAIN][DATA_DNS_PROBE_ENGINE] = DNSProbeEngine()
+    probe_hub = hass.data[DOMAIN].setdefault(DATA_PROBE_HUB, ProbeHub())
     links = await hass.async_add_executor_job(setup_links)
-    coordinator = InternetStatusCoordinator(hass, entry, links)
-    await coordinator.async_config_entry_first_refresh()
+    if links.reverse_lookup_cache:
+        hass.data[DOMAIN].setdefault(
+            DATA_REVERSE_LOOKUP_CACHE, links.reverse_lookup_cache
+        )
+    history_path = hass.config.path(
+        STORAGE_DIR, HISTORY_FILENAME.format(entry.entry_id)
+    )
+    if history_size := entry.options.get(
+        CONF_HISTORY_SIZE, DEFAULTS[CONF_HISTORY_SIZE]
+    ):
+        history = await hass.async_add_executor_job(
+            RttHistory, history_path, history_size
+        )
+    else:
+        history = None
+        await hass.async_add_executor_job(remove_history, history_path)
+    coordinator = InternetStatusCoordinator(hass, entry, links, history=history)
+    await coordinator.async_restore_state()
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    ## Entities start in an unknown state and are updated as links are probed,
+    ## so that down links do not delay startup
+    entry.async_create_background_task(
+        hass, coordinator.async_first_refresh(), f"{DOMAIN} first refresh"
+    )
+
     async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Handle options update."""
         await hass.config_entries.async_reload(entry.entry_id)
@@ -48,8 +193,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     async def async_reset_configured_ips_all(_service_call: ServiceCall) -> None:
         """Reset the configured IP for all links."""
         _LOGGER.debug("reset_configured_ips_all()")
-        coordinator.reset_configured_ip()
-        await coordinator.async_refresh_full()
+        await coordinator.async_reset_configured_ip()
 
     hass.services.async_register(
         DOMAIN, "reset_configured_ips_all", async_reset_configured_ips_all
@@ -64,5 +208,23 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
+        if not any(
+            isinstance(coordinator, InternetStatusCoordinator)
+            for coordinator in hass.data[DOMAIN].values()
+        ):
+            ## Last entry unloaded, close shared probe sockets
+            if dns_probe_engine := hass.data[DOMAIN].pop(DATA_DNS_PROBE_ENGINE, None):
+                dns_probe_engine.close()
+            hass.data[DOMAIN].pop(DATA_REVERSE_LOOKUP_CACHE, None)
+            hass.data[DOMAIN].pop(DATA_PROBE_HUB, None)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted link state of a removed config entry."""
+    await link_state_store(hass, entry.entry_id).async_remove()
+    await hass.async_add_executor_job(
+        remove_history,
+        hass.config.path(STORAGE_DIR, HISTORY_FILENAME.format(entry.entry_id)),
+    )
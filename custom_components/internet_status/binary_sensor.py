@@ -11,9 +11,7 @@ from homeassistant.config_entries import ConfigEntry
 import homeassistant.helpers.config_validation as cv
 from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.helpers import entity_platform
-from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
 from .const import (
@@ -22,14 +20,18 @@ from .const import (
     ATTR_CONFIGURED_IP,
     ATTR_CURRENT_IP,
     ATTR_LINK_FAILOVER,
+    ATTR_PHI,
     SERVICE_SET_CONFIGURED_IP,
+    SERVICE_PROBE_LINK,
 )
 from .coordinator import InternetStatusCoordinator, InternetLink
+from .entity import InternetStatusEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 
 INTERNET_STATUS_SET_CONFIGURED_IP_SCHEMA = {vol.Required("entity_id"): cv.entity_id}
+INTERNET_STATUS_PROBE_LINK_SCHEMA = {vol.Required("entity_id"): cv.entity_id}
 
 
 async def async_setup_entry(
@@ -43,7 +45,7 @@ async def async_setup_entry(
 
     for link in coordinator.links.links_all.values():
         entities.append(LinkStatusBinarySensor(coordinator, link))
-    async_add_entities(entities, update_before_add=True)
+    async_add_entities(entities)
 
     platform = entity_platform.async_get_current_platform()
 
@@ -52,9 +54,14 @@ async def async_setup_entry(
         INTERNET_STATUS_SET_CONFIGURED_IP_SCHEMA,
         LinkStatusBinarySensor.async_set_configured_ip,
     )
+    platform.async_register_entity_service(
+        SERVICE_PROBE_LINK,
+        INTERNET_STATUS_PROBE_LINK_SCHEMA,
+        LinkStatusBinarySensor.async_probe_link,
+    )
 
 
-class LinkStatusBinarySensor(CoordinatorEntity, BinarySensorEntity):
+class LinkStatusBinarySensor(InternetStatusEntity, BinarySensorEntity):
     """Binary sensor representing status of an Internet link."""
 
     _attr_has_entity_name = True
@@ -76,14 +83,6 @@ class LinkStatusBinarySensor(CoordinatorEntity, BinarySensorEntity):
         """Return the entity icon."""
         return DEF_LINK_ICON.get(self.link.link_up, DEF_LINK_ICON[None])
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.coordinator.entry.entry_id)},
-            name=self.coordinator.entry.title,
-        )
-
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
@@ -94,10 +93,17 @@ class LinkStatusBinarySensor(CoordinatorEntity, BinarySensorEntity):
             ATTR_CURRENT_IP: self.link.current_ip,
             ATTR_LINK_FAILOVER: self.link.link_failover,
         }
-        self.async_write_ha_state()
+        if self.link.failure_detector:
+            self._attr_extra_state_attributes[ATTR_PHI] = self.link.phi
+        self.async_write_ha_state_if_changed()
 
     async def async_set_configured_ip(self, _service_call: ServiceCall) -> None:
         """Update the configured IP for link."""
         _LOGGER.debug("set_configured_ip(%s)", self.link.name)
         self.link.set_configured_ip()
-        await self.coordinator.async_refresh_full()
+        await self.coordinator.async_refresh_links([self.link])
+
+    async def async_probe_link(self, _service_call: ServiceCall) -> None:
+        """Probe the link now and update the affected entities."""
+        _LOGGER.debug("probe_link(%s)", self.link.name)
+        await self.coordinator.async_refresh_links([self.link])
@@ -1,4 +1,5 @@
 """Config flow for Internet Status integration."""
+
 from __future__ import annotations
 
 from typing import Any, Tuple
@@ -27,6 +28,18 @@ from .const import (
     CONF_CONFIGURED_IP,
     CONF_RTT_SENSOR,
     CONF_UPDATE_INTERVAL,
+    CONF_SAMPLES,
+    CONF_STATISTICS,
+    CONF_HEDGE_DELAY,
+    CONF_QUORUM,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_HISTORY_SIZE,
+    CONF_WATCH,
+    CONF_STATUS_KEY,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_CONFIRM_INTERVAL,
+    CONF_PHI_THRESHOLD,
+    ProbeType,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -38,6 +51,14 @@ RTT_SCHEMA = vol.Schema(
             CONF_UPDATE_INTERVAL,
             default=DEFAULTS[CONF_RTT_SENSOR][CONF_UPDATE_INTERVAL],
         ): cv.positive_int,
+        vol.Optional(
+            CONF_SAMPLES,
+            default=DEFAULTS[CONF_RTT_SENSOR][CONF_SAMPLES],
+        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(
+            CONF_STATISTICS,
+            default=DEFAULTS[CONF_RTT_SENSOR][CONF_STATISTICS],
+        ): cv.boolean,
     }
 )
 
@@ -45,13 +66,26 @@ LINK_SCHEMA = vol.Schema(
     {
         vol.Optional(CONF_NAME): cv.string,
         vol.Optional(CONF_LINK_TYPE, default=DEFAULTS[CONF_LINK_TYPE]): cv.string,
-        vol.Optional(CONF_PROBE_TARGET): cv.string,
+        vol.Optional(CONF_PROBE_TARGET): vol.Any(
+            cv.string, vol.All([cv.string], vol.Length(min=1))
+        ),
         vol.Optional(CONF_PROBE_TYPE): cv.string,
         vol.Optional(CONF_REVERSE_HOSTNAME): cv.string,
         vol.Optional(CONF_CONFIGURED_IP): cv.string,
         vol.Optional(CONF_SCAN_INTERVAL): cv.positive_time_period,
         vol.Optional(CONF_TIMEOUT): cv.socket_timeout,
         vol.Optional(CONF_RETRIES): cv.positive_int,
+        vol.Optional(CONF_MAX_SCAN_INTERVAL): cv.positive_int,
+        vol.Optional(CONF_CONFIRM_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)
+        ),
+        vol.Optional(CONF_PHI_THRESHOLD): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)
+        ),
+        vol.Optional(CONF_HEDGE_DELAY): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_QUORUM): cv.positive_int,
+        vol.Optional(CONF_WATCH): cv.boolean,
+        vol.Optional(CONF_STATUS_KEY): cv.string,
         vol.Optional(CONF_RTT_SENSOR): vol.Maybe(RTT_SCHEMA),
     }
 )
@@ -78,6 +112,24 @@ OPTIONS_SCHEMA_ITEMS = {
             )
         ),
     ),  # cv.positive_int,
+    vol.Optional(
+        CONF_HEARTBEAT_INTERVAL, default=DEFAULTS[CONF_HEARTBEAT_INTERVAL]
+    ): vol.Coerce(
+        int,
+        selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                mode=selector.NumberSelectorMode.BOX, min=0, step=1
+            )
+        ),
+    ),
+    vol.Optional(CONF_HISTORY_SIZE, default=DEFAULTS[CONF_HISTORY_SIZE]): vol.Coerce(
+        int,
+        selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                mode=selector.NumberSelectorMode.BOX, min=0, step=1000
+            )
+        ),
+    ),
     vol.Optional(CONF_LINKS, default=[]): selector.ObjectSelector(),
 }
 
@@ -98,7 +150,29 @@ def validate_input(user_input: dict[str, Any]) -> Tuple[str, dict[str, Any]]:
     ## Validate links schema. Throws exception if invalid.
     title = user_input.get(CONF_NAME, DEFAULTS[CONF_NAME])
     links_schema = vol.Schema([LINK_SCHEMA])
-    links_schema(user_input[CONF_LINKS])
+    links = links_schema(user_input[CONF_LINKS])
+    scan_interval = user_input.get(CONF_SCAN_INTERVAL, DEFAULTS[CONF_SCAN_INTERVAL])
+    for index, link in enumerate(links):
+        ## Only DNS probe types accept a list of equivalent probe servers
+        if isinstance(link.get(CONF_PROBE_TARGET), list) and link.get(
+            CONF_PROBE_TYPE
+        ) not in (ProbeType.GOOGLE, ProbeType.OPENDNS, ProbeType.AKAMAI):
+            raise vol.Invalid(
+                f"{CONF_PROBE_TARGET} must be a single target for "
+                f"{CONF_PROBE_TYPE} {link.get(CONF_PROBE_TYPE)}",
+                path=[CONF_LINKS, index, CONF_PROBE_TARGET],
+            )
+        link_scan_interval = (
+            link[CONF_SCAN_INTERVAL].total_seconds()
+            if CONF_SCAN_INTERVAL in link
+            else scan_interval
+        )
+        max_scan_interval = link.get(CONF_MAX_SCAN_INTERVAL)
+        if max_scan_interval is not None and max_scan_interval <= link_scan_interval:
+            raise vol.Invalid(
+                f"{CONF_MAX_SCAN_INTERVAL} must be greater than {CONF_SCAN_INTERVAL}",
+                path=[CONF_LINKS, index, CONF_MAX_SCAN_INTERVAL],
+            )
 
     return title, {k: v for k, v in user_input.items() if k not in [CONF_NAME]}
 
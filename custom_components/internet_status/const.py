@@ -17,8 +17,30 @@ CONF_REVERSE_HOSTNAME = "reverse_hostname"
 CONF_CONFIGURED_IP = "configured_ip"
 CONF_RTT_SENSOR = "rtt_sensor"
 CONF_UPDATE_INTERVAL = "update_interval"
+CONF_SAMPLES = "samples"
+CONF_STATISTICS = "statistics"
+CONF_HEDGE_DELAY = "hedge_delay"
+CONF_QUORUM = "quorum"
+CONF_HEARTBEAT_INTERVAL = "heartbeat_interval"
+CONF_WATCH = "watch"
+CONF_STATUS_KEY = "status_key"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_CONFIRM_INTERVAL = "confirm_interval"
+CONF_PHI_THRESHOLD = "phi_threshold"
+CONF_HISTORY_SIZE = "history_size"
 
 SERVICE_SET_CONFIGURED_IP = "set_configured_ip"
+SERVICE_PROBE_LINK = "probe_link"
+SERVICE_PROFILE = "profile"
+ATTR_CYCLES = "cycles"
+ATTR_FILENAME = "filename"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+DEF_PROFILE_CYCLES = 10
+DEF_PROFILE_FILENAME = "internet_status_profile.txt"
+SERVICE_EXPORT_HISTORY = "export_history"
+ATTR_START = "start"
+ATTR_END = "end"
+DEF_HISTORY_FILENAME = "internet_status_history.csv"
 
 
 class LinkType(StrEnum):
@@ -37,24 +59,57 @@ class ProbeType(StrEnum):
     AKAMAI = "akamai"
     PING = "ping"
     FILE = "file"
+    STATUS_FILE = "status_file"
 
 
 DEFAULTS = {
     CONF_SCAN_INTERVAL: 30,
     CONF_TIMEOUT: 1.0,
     CONF_RETRIES: 3,
+    CONF_QUORUM: 1,
+    CONF_HEARTBEAT_INTERVAL: 0,
+    CONF_HISTORY_SIZE: 0,
+    CONF_WATCH: False,
+    CONF_CONFIRM_INTERVAL: 5,
     CONF_LINK_TYPE: LinkType.MONITOR_ONLY,
     CONF_NAME: "Internet Status",
     # CONF_PROBE_SERVER: "ns%d.google.com",
     CONF_PROBE_TYPE: ProbeType.GOOGLE,
     CONF_RTT_SENSOR: {
         CONF_UPDATE_INTERVAL: 300,
+        CONF_SAMPLES: 100,
+        CONF_STATISTICS: False,
     },
 }
 DEF_LINK_NAME_PREFIX = "Link "
 DEF_LINK_RTT_SUFFIX = " RTT"
 
-MIN_UPDATE_INTERVAL = 5
+## Deadlines due within this many seconds are processed in the same wakeup
+SCHEDULE_TOLERANCE = 0.05
+
+## Hedged probes in flight when a quorum is reached are given this many
+## seconds to complete, so that their rtts are included
+HEDGE_GRACE_PERIOD = 0.1
+
+## Links reuse shared probe results up to this ratio of their scan interval old
+PROBE_HUB_MAX_AGE_RATIO = 0.5
+
+## Persisted link state, written at most once per save delay (s)
+STORAGE_VERSION = 1
+STORAGE_KEY = DOMAIN
+STORAGE_SAVE_DELAY = 300
+
+## Adaptive scan interval: consecutive stable probes before backing off, the
+## backoff factor, and the rtt deviation from baseline that triggers a
+## confirmation probe (ratio and minimum in ms)
+ADAPTIVE_STABLE_PROBES = 3
+ADAPTIVE_BACKOFF = 1.5
+ADAPTIVE_RTT_DEVIATION = 2.0
+ADAPTIVE_RTT_MIN_DEVIATION = 10.0
+ADAPTIVE_RTT_SMOOTHING = 0.2
+
+## Number of probe intervals held by the phi-accrual failure detector
+PHI_WINDOW = 100
 
 DEF_INTERNET_STATUS_ICON = {
     "up": "mdi:lan-connect",
@@ -75,9 +130,29 @@ ATTR_CONFIGURED_IP = CONF_CONFIGURED_IP
 ATTR_CURRENT_IP = "current_ip"
 ATTR_IP_LAST_UPDATED = "ip_last_updated"
 ATTR_LINK_FAILOVER = "link_failover"
+ATTR_PHI = "phi"
+ATTR_PROBE_SERVERS = "probe_servers"
+ATTR_STATISTIC_ID = "statistic_id"
 ATTR_RTT = "rtt"
+ATTR_RTT_MIN = "rtt_min"
+ATTR_RTT_MEAN = "rtt_mean"
+ATTR_RTT_MAX = "rtt_max"
+ATTR_RTT_P50 = "rtt_p50"
+ATTR_RTT_P95 = "rtt_p95"
+ATTR_RTT_P99 = "rtt_p99"
+ATTR_JITTER = "jitter"
+ATTR_LOSS = "loss"
+ATTR_SAMPLES = "samples"
+ATTR_WINDOW_MIN = "window_min"
+ATTR_WINDOW_MEAN = "window_mean"
+ATTR_WINDOW_MAX = "window_max"
+ATTR_WINDOW_P95 = "window_p95"
+ATTR_WINDOW_SAMPLES = "window_samples"
 
 DATA_DOMAIN_CONFIG = "domain_config"
+DATA_DNS_PROBE_ENGINE = "dns_probe_engine"
+DATA_REVERSE_LOOKUP_CACHE = "reverse_lookup_cache"
+DATA_PROBE_HUB = "probe_hub"
 DATA_SENSOR_ENTITY = "sensor_entity"
 DATA_PRIMARY_LINK_ENTITY = "primary_link_entity"
 DATA_SECONDARY_LINK_ENTITIES = "secondary_link_entities"
@@ -1,32 +1,26 @@
 """Internet Status data update coordinator."""
 
 from abc import ABC
-from datetime import datetime, timedelta, UTC
+from datetime import datetime
+from collections.abc import Callable, Iterable
 from typing import Any
 import asyncio
+import cProfile
+import heapq
+import itertools
 import logging
-import math
-
-# import time
-import aiofiles
-import dns.asyncresolver
-import dns.resolver
-import dns.rdata
-import dns.rdataclass
-import dns.rdatatype
-import dns.inet
-import dns.ipv4
-import dns.reversename
-import dns.exception
-
-from icmplib import NameLookupError, async_ping
+import socket
+import time
 
 from homeassistant.const import CONF_NAME
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util import slugify
+import homeassistant.util.dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -39,30 +33,98 @@ from .const import (
     CONF_LINK_TYPE,
     CONF_CONFIGURED_IP,
     CONF_REVERSE_HOSTNAME,
+    CONF_HEDGE_DELAY,
+    CONF_QUORUM,
     CONF_RTT_SENSOR,
     CONF_UPDATE_INTERVAL,
+    CONF_SAMPLES,
+    CONF_STATISTICS,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_WATCH,
+    CONF_STATUS_KEY,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_CONFIRM_INTERVAL,
+    CONF_PHI_THRESHOLD,
     DEFAULTS,
     DEF_LINK_NAME_PREFIX,
-    MIN_UPDATE_INTERVAL,
+    DEF_LINK_RTT_SUFFIX,
+    SCHEDULE_TOLERANCE,
+    HEDGE_GRACE_PERIOD,
+    PROBE_HUB_MAX_AGE_RATIO,
+    STORAGE_KEY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    ADAPTIVE_STABLE_PROBES,
+    ADAPTIVE_BACKOFF,
+    ADAPTIVE_RTT_DEVIATION,
+    ADAPTIVE_RTT_MIN_DEVIATION,
+    ADAPTIVE_RTT_SMOOTHING,
+    PHI_WINDOW,
     ProbeType,
     LinkType,
 )
+from .dns_probe import (
+    DNSProbeEngine,
+    DNSProbeError,
+    DNSProbeServer,
+    DNSProbeTimeout,
+    QTYPE_A,
+    QTYPE_TXT,
+    build_query,
+)
+from .failover import FailoverIndex
+from .failure_detector import PhiAccrualDetector
+from .file_reader import FileReader
+from .file_watch import FileWatcher, FileWatchError
+from .history import RttHistory, name_hash, write_history_csv
+from .icmp_probe import ICMPProbeEngine, ICMPProbeError
+from .instrumentation import (
+    PROBE_PREFIX,
+    STAGE_CYCLE,
+    STAGE_DISPATCH,
+    STAGE_REVERSE_LOOKUP,
+    STAGE_STATUS,
+    Instrumentation,
+    write_profile_report,
+)
+from .probe_hub import ProbeHub, ProbeSnapshot
+from .probe_socket import ip_address_family
+from .reverse_lookup import ReverseLookupCache, ReverseLookupError
+from .status_file import StatusFile
+from .stats import RttHourlyStats, RttStats, RttWindow
 
 _LOGGER = logging.getLogger(__name__)
 
+SCHEDULE_PROBE = "probe"
+SCHEDULE_RTT = "rtt"
+
+
+def link_state_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store holding the persisted link state of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry_id}")
+
 
 class InternetLinks:
     """Configured Internet links."""
 
-    def __init__(self, config: dict[str, Any]):
+    def __init__(
+        self,
+        config: dict[str, Any],
+        dns_probe_engine: DNSProbeEngine | None = None,
+        reverse_lookup_cache: ReverseLookupCache | None = None,
+        probe_hub: ProbeHub | None = None,
+    ):
         """Create links from config."""
         self.links_all: dict[str, InternetLink] = {}
         self.slugs_all: list[str] = []
         self.primary_link: InternetLink = None
         self.secondary_links: list[InternetLink] = []
         self.monitor_links: list[InternetLink] = []
+        self.icmp_probe_engine: ICMPProbeEngine | None = None
+        self.reverse_lookup_cache = reverse_lookup_cache
 
         link_id = 1
+        status_files: dict[str, StatusFile] = {}
 
         def get_unique_name(name: str) -> str:
             """Generate a unique link name."""
@@ -100,11 +162,37 @@ class InternetLinks:
                 case ProbeType.FILE:
                     link = ProbeFileLink(name, link_type, link_config=link_config)
                 case ProbeType.GOOGLE | ProbeType.OPENDNS | ProbeType.AKAMAI:
+                    if (
+                        link_config.get(CONF_REVERSE_HOSTNAME)
+                        and self.reverse_lookup_cache is None
+                    ):
+                        self.reverse_lookup_cache = ReverseLookupCache()
                     link = PROBE_TYPE_CLASS_MAP[probe_type](
-                        name, link_type, link_config=link_config
+                        name,
+                        link_type,
+                        link_config=link_config,
+                        dns_probe_engine=dns_probe_engine,
+                        reverse_lookup_cache=self.reverse_lookup_cache,
                     )
                 case ProbeType.PING:
-                    link = ProbePingLink(name, link_type, link_config=link_config)
+                    if self.icmp_probe_engine is None:
+                        self.icmp_probe_engine = ICMPProbeEngine()
+                    link = ProbePingLink(
+                        name,
+                        link_type,
+                        link_config=link_config,
+                        icmp_probe_engine=self.icmp_probe_engine,
+                    )
+                case ProbeType.STATUS_FILE:
+                    path = link_config[CONF_PROBE_TARGET]
+                    if path not in status_files:
+                        status_files[path] = StatusFile(path)
+                    link = ProbeStatusFileLink(
+                        name,
+                        link_type,
+                        link_config=link_config,
+                        status_file=status_files[path],
+                    )
                 case _:
                     _LOGGER.warning(
                         "unknown probe_type %s for link %s", probe_type_raw, name
@@ -128,6 +216,7 @@ class InternetLinks:
             else:
                 _LOGGER.warning("unknown link_type %s for link %s", link_type, name)
                 continue
+            link.probe_hub = probe_hub
             self.links_all[name] = link
             self.slugs_all.append(slugify(name))
             link_id += 1
@@ -135,92 +224,271 @@ class InternetLinks:
         if self.primary_link is None:
             raise RuntimeError("no primary link defined")
 
+    def close(self) -> None:
+        """Close all links and the ICMP probe engine."""
+        for link in self.links_all.values():
+            link.close()
+        if self.icmp_probe_engine:
+            self.icmp_probe_engine.close()
+
 
 class InternetStatusCoordinator(DataUpdateCoordinator):
-    """Internet Status coordinator."""
+    """
+    Internet Status coordinator.
+
+    Links are probed on their own scan_interval rather than on a common tick.
+    Probe and RTT publish deadlines are kept in a priority queue ordered by
+    monotonic time, and the coordinator wakes only when the earliest deadline
+    is due. Only the links that are due are probed, and only the entities
+    affected by the result are notified. Due links are probed in a background
+    task, so a slow or down link does not delay the deadlines of the other
+    links.
+    """
 
     def __init__(
-        self, hass: HomeAssistant, entry: ConfigEntry, links: InternetLinks
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        links: InternetLinks,
+        history: RttHistory | None = None,
     ) -> None:
         """Initialise Internet Status coordinator."""
         self.entry = entry
         self.links = links
+        self.history = history
         self.internet_status = None
         self._configured_ip_updated = False
         self._full_update = True
-        link_scan_intervals = [
-            link.scan_interval for link in self.links.links_all.values()
-        ]
-        link_rtt_update_intervals = [
-            link.rtt_update_interval
-            for link in self.links.links_all.values()
-            if getattr(link, "rtt_update_interval", None)
-        ]
-        update_interval = max(
-            math.gcd(*link_scan_intervals, *link_rtt_update_intervals),
-            MIN_UPDATE_INTERVAL,
+        self.heartbeat_interval: int = entry.options.get(
+            CONF_HEARTBEAT_INTERVAL, DEFAULTS[CONF_HEARTBEAT_INTERVAL]
+        )
+        self._probing: set[InternetLink] = set()  ## links with probes in progress
+        self._failover_index = FailoverIndex(
+            [links.primary_link] + links.secondary_links
         )
-        _LOGGER.debug("setting update interval to %d", update_interval)
+        self.instrumentation = Instrumentation()
+        self._profile_path: str | None = None
+        self._schedule: list[tuple[float, int, str, InternetLink]] = []
+        self._schedule_seq = itertools.count()
+        self._unsub_schedule: CALLBACK_TYPE | None = None
+        self._store = link_state_store(hass, entry.entry_id)
+        self._save_scheduled = False
+        self._restored = False
+        for link in self.links.links_all.values():
+            link.update_callback = self.async_request_link_update
+            link.instrumentation = self.instrumentation
+            link.history = history
+            if link.rtt_statistics:
+                link.rtt_statistic_id = (
+                    f"{DOMAIN}:{slugify(entry.entry_id)}_{slugify(link.name)}_rtt"
+                )
         super().__init__(
             hass,
             _LOGGER.getChild("coordinator"),
             # Name of the data. For logging purposes.
             name="InternetStatus",
-            update_interval=timedelta(seconds=update_interval),
-            update_method=self.async_update_link_status,
+            update_interval=None,  ## links are scheduled individually
         )
 
-    async def async_refresh_full(self) -> None:
-        """Perform a full refresh."""
-        _LOGGER.debug("forcing full update")
-        self._full_update = True
-        await self.async_refresh()
+    async def async_shutdown(self) -> None:
+        """Cancel scheduled link updates and shut down the coordinator."""
+        ## Stop update cycles in progress from scheduling further updates
+        self._shutdown_requested = True
+        self._async_cancel_schedule()
+        self.instrumentation.stop_profile()
+        self._async_import_rtt_statistics(self.links.links_all.values())
+        self.links.close()
+        await self._store.async_save(self._data_to_store())
+        if self.history:
+            await self.hass.async_add_executor_job(self.history.close)
+            self.history = None
+        await super().async_shutdown()
+
+    async def async_restore_state(self) -> None:
+        """Restore the link state persisted before the last restart."""
+        if not (data := await self._store.async_load()):
+            return
+        for name, state in data.get("links", {}).items():
+            if link := self.links.links_all.get(name):
+                link.restore_state(state)
+                self._restored = True
+        _LOGGER.debug("restored link state: %s", self._restored)
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Schedule a delayed write of the link state, if not already scheduled."""
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self._store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_store(self) -> dict[str, Any]:
+        """Return the link state to persist."""
+        self._save_scheduled = False
+        return {
+            "links": {
+                name: link.state_to_store()
+                for name, link in self.links.links_all.items()
+            }
+        }
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners."""
+        start_ns = time.perf_counter_ns()
+        super().async_update_listeners()
+        self.instrumentation.record(STAGE_DISPATCH, start_ns)
+
+    @callback
+    def async_start_profile(self, cycles: int, path: str) -> None:
+        """Profile the next update cycles and write the results to path."""
+        if not self.hass.config.is_allowed_path(path):
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="profile_path_not_allowed",
+                translation_placeholders={"path": path},
+            )
+        try:
+            self.instrumentation.start_profile(cycles)
+        except ValueError as exc:
+            ## Profiles are process-wide, so this entry or another is profiling
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="profile_in_progress",
+            ) from exc
+        _LOGGER.info("profiling %d update cycles", cycles)
+        self._profile_path = path
 
-    async def async_update_link_status(self) -> None:
-        """Update link statuses and overall Internet status."""
-        link: InternetLink
-        async with asyncio.TaskGroup() as tgr:
-            for link in self.links.links_all.values():
-                tgr.create_task(link.async_update(self._full_update))
-        self._full_update = False
+    async def async_export_history(
+        self, path: str, start: datetime | None = None, end: datetime | None = None
+    ) -> None:
+        """Export the RTT history between start and end to a CSV file."""
+        if self.history is None:
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="history_disabled",
+            )
+        if not self.hass.config.is_allowed_path(path):
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="history_path_not_allowed",
+                translation_placeholders={"path": path},
+            )
+        count = await self.hass.async_add_executor_job(
+            write_history_csv,
+            path,
+            self.history,
+            self.history.position(),
+            {link.history_id: name for name, link in self.links.links_all.items()},
+            dt_util.as_timestamp(start) if start else None,
+            dt_util.as_timestamp(end) if end else None,
+        )
+        _LOGGER.info("exported %d probes to %s", count, path)
+
+    @callback
+    def _async_cycle_done(self, start_ns: int) -> None:
+        """Record the duration of an update cycle and complete any profile."""
+        self.instrumentation.record(STAGE_CYCLE, start_ns)
+        self._async_schedule_save()
+        if profiler := self.instrumentation.cycle_done():
+            self.hass.async_create_task(self._async_write_profile(profiler))
+
+    async def _async_write_profile(self, profiler: cProfile.Profile) -> None:
+        """Write the profile report."""
+        path = self._profile_path
+        try:
+            await self.hass.async_add_executor_job(
+                write_profile_report, path, profiler, self.instrumentation.summary()
+            )
+        except OSError as exc:
+            _LOGGER.error("cannot write profile to %s: %s", path, exc)
+        else:
+            _LOGGER.info("profile written to %s", path)
+
+    async def async_first_refresh(self) -> None:
+        """
+        Probe all links after setup without blocking it.
+
+        The entities of each link are updated as soon as its probe completes,
+        so a down link does not delay the others. Link failover status and the
+        overall Internet status are evaluated once all links have been probed.
+        """
+        start_ns = time.perf_counter_ns()
+        contexts: set[Any] = {self}
+        if self._restored:
+            ## Publish the restored state while it is verified by probing. RTT
+            ## sensors have no restored samples, and are published once probed
+            self.update_internet_status()
+            self.async_update_listeners_for({self, *self.links.links_all.values()})
+        ## Links are not refreshed again until their first probe completes
+        self._probing.update(self.links.links_all.values())
+        try:
+            async with asyncio.TaskGroup() as tgr:
+                for link in self.links.links_all.values():
+                    tgr.create_task(self._async_first_update_link(link))
+            status_start_ns = time.perf_counter_ns()
+            contexts.update(self.update_internet_status())
+            self.instrumentation.record(STAGE_STATUS, status_start_ns)
+            self._full_update = False
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("unexpected error during first refresh")
+        finally:
+            self._probing.clear()
+        _LOGGER.debug("first refresh done")
+        self.async_update_listeners_for(contexts)
+        self._spread_deadlines()
+        self._async_schedule_all()
+        self._async_cycle_done(start_ns)
+
+    def _spread_deadlines(self) -> None:
+        """
+        Spread the next probes of the links across their scan intervals.
+
+        All links are probed together by the first refresh, so links with the
+        same scan interval would otherwise stay in phase and probe in bursts.
+        Each link is probed again within its scan interval.
+        """
+        links = list(self.links.links_all.values())
+        current_time = time.monotonic()
+        for position, link in enumerate(links, 1):
+            link.next_update = min(
+                link.next_update,
+                current_time + link.current_scan_interval * position / len(links),
+            )
 
+    async def _async_first_update_link(self, link: "InternetLink") -> None:
+        """Probe a link and update its entities, including its RTT sensor."""
+        await link.async_update(True)
+        self.async_update_listeners_for({link, link.rtt_context})
+
+    def update_internet_status(
+        self, links: Iterable["InternetLink"] | None = None
+    ) -> set["InternetLink"]:
+        """
+        Update link failover status and overall Internet status.
+
+        Only the specified links that have been probed, and the links affected
+        by changes to their IP addresses, are re-evaluated. All links are
+        re-evaluated if links is None. Returns the links whose status changed.
+        """
         ## Update link failover status
-        main_links = [self.links.primary_link] + self.links.secondary_links
-        link_failover_any = False
-        while main_links:
-            link = main_links.pop(0)
-            main_link_ips = {
-                (l.configured_ip or l.current_ip): l.name
-                for l in main_links
-                if l.configured_ip or l.current_ip
-            }
-            link_failover = False
-            if link.current_ip:
-                link_failover = link.current_ip in main_link_ips.keys()
-                if link_failover:
-                    link_failover_any = True
-                    link.link_up = None  ## for links with no configured IP set
-            if link.link_failover != link_failover:
-                if link_failover:
-                    _LOGGER.info(
-                        "%s: failed over to link %s",
-                        link.name,
-                        main_link_ips[link.current_ip],
-                    )
-                elif link.link_failover is not None:
-                    _LOGGER.info("%s: link failover cleared", link.name)
-                link.link_failover = link_failover
+        if links is None:
+            changed = self._failover_index.rebuild()
+        else:
+            changed = self._failover_index.update(links)
 
         ## Determine internet status
         primary_link = self.links.primary_link
         primary_up = primary_link.link_up
-        secondaries_up = [link.link_up for link in self.links.secondary_links]
+        secondaries_down = len(self._failover_index.secondaries_down)
         internet_status = "up"
 
         if not primary_up or primary_link.link_failover:
             ## Primary link failed but has not failed over to secondary yet
             internet_status = "degraded (primary down)"
-            if primary_up is False and not any(secondaries_up):
+            if primary_up is False and secondaries_down == len(
+                self.links.secondary_links
+            ):
                 ## Primary and all secondary links have failed
                 internet_status = "down"
             elif primary_link.link_failover:
@@ -228,29 +496,235 @@ class InternetStatusCoordinator(DataUpdateCoordinator):
                 internet_status = "failover to secondary (primary down)"
             else:
                 internet_status = "failover to other link (primary down)"
-        elif not all(secondaries_up):  # primary_up is True
+        elif secondaries_down:  # primary_up is True
             ## A secondary link has failed but primary link is up
             internet_status = "degraded (secondary down)"
         else:  ## Primary and all secondaries are up
-            if not link_failover_any and not self._configured_ip_updated:
-                self.set_configured_ip()
+            if not self._failover_index.failed_over and not self._configured_ip_updated:
+                changed.update(self.set_configured_ip())
 
         if self.internet_status != internet_status:
             _LOGGER.info("internet_status: %s", internet_status)
         self.internet_status = internet_status
-
-    def set_configured_ip(self) -> None:
-        """Set configured IP for links that do not have a configured IP."""
+        return changed
+
+    @callback
+    def async_update_listeners_for(self, contexts: set[Any]) -> None:
+        """Update the listeners registered with the specified contexts."""
+        start_ns = time.perf_counter_ns()
+        for update_callback, context in list(self._listeners.values()):
+            if context in contexts:
+                update_callback()
+        self.instrumentation.record(STAGE_DISPATCH, start_ns)
+
+    def _schedule_push(self, deadline: float, kind: str, link: "InternetLink") -> None:
+        """Add a link deadline to the schedule."""
+        heapq.heappush(self._schedule, (deadline, next(self._schedule_seq), kind, link))
+
+    @callback
+    def _async_schedule_all(self) -> None:
+        """Rebuild the schedule from the deadlines of all links."""
+        if self._shutdown_requested:
+            return
+        self._schedule = []
         for link in self.links.links_all.values():
-            if link.configured_ip is None and link.current_ip:
-                link.set_configured_ip()
+            self._schedule_push(link.next_update, SCHEDULE_PROBE, link)
+            if getattr(link, "rtt_update_interval", None):
+                self._schedule_push(link.rtt_next_update, SCHEDULE_RTT, link)
+        self._async_schedule_next()
+
+    @callback
+    def _async_schedule_next(self) -> None:
+        """Schedule a wakeup at the earliest link deadline."""
+        self._async_cancel_schedule()
+        if not self._schedule or self._shutdown_requested or self.hass.is_stopping:
+            return
+        delay = max(self._schedule[0][0] - time.monotonic(), 0)
+        self._unsub_schedule = async_call_later(
+            self.hass, delay, self._async_handle_schedule
+        )
+
+    @callback
+    def _async_cancel_schedule(self) -> None:
+        """Cancel the scheduled wakeup."""
+        if self._unsub_schedule is not None:
+            self._unsub_schedule()
+            self._unsub_schedule = None
+
+    @callback
+    def _async_handle_schedule(self, _now: datetime) -> None:
+        """Start probing due links and publish due RTT sensors."""
+        start_ns = time.perf_counter_ns()
+        self._unsub_schedule = None
+        try:
+            due_time = time.monotonic() + SCHEDULE_TOLERANCE
+            probe_links: set[InternetLink] = set()
+            rtt_links: set[InternetLink] = set()
+            while self._schedule and self._schedule[0][0] <= due_time:
+                deadline, _, kind, link = heapq.heappop(self._schedule)
+                if kind == SCHEDULE_PROBE:
+                    if deadline == link.next_update:  ## skip stale entries
+                        probe_links.add(link)
+                elif deadline == link.rtt_next_update:
+                    ## Advance from the previous deadline to avoid drift
+                    link.rtt_next_update = max(
+                        deadline + link.rtt_update_interval, time.monotonic()
+                    )
+                    link.rtt_publish = True
+                    rtt_links.add(link)
+                    self._schedule_push(link.rtt_next_update, SCHEDULE_RTT, link)
+
+            self._async_import_rtt_statistics(rtt_links)
+            self.async_update_listeners_for({link.rtt_context for link in rtt_links})
+            if probe_links:
+                ## Probed links are rescheduled when their probes complete
+                self.entry.async_create_background_task(
+                    self.hass,
+                    self.async_refresh_links(probe_links, False),
+                    f"{DOMAIN} probe",
+                )
+            else:
+                self._async_cycle_done(start_ns)
+        finally:
+            self._async_schedule_next()
+
+    @callback
+    def _async_import_rtt_statistics(self, links: Iterable["InternetLink"]) -> None:
+        """Import the hourly rtt statistics of links as long-term statistics."""
+        if "recorder" not in self.hass.config.components:
+            return
+        # pylint: disable=import-outside-toplevel
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        for link in links:
+            if not link.rtt_statistics or not (hours := link.rtt_statistics.collect()):
+                continue
+            _LOGGER.debug(
+                "%s: importing %d hours of rtt statistics", link.name, len(hours)
+            )
+            async_add_external_statistics(
+                self.hass,
+                {
+                    "has_mean": True,
+                    "has_sum": False,
+                    "name": f"{self.entry.title} {link.name}{DEF_LINK_RTT_SUFFIX}",
+                    "source": DOMAIN,
+                    "statistic_id": link.rtt_statistic_id,
+                    "unit_of_measurement": "ms",
+                },
+                [
+                    {
+                        "start": dt_util.utc_from_timestamp(start),
+                        "mean": mean,
+                        "min": min_rtt,
+                        "max": max_rtt,
+                    }
+                    for start, mean, min_rtt, max_rtt in hours
+                ],
+            )
+
+    async def async_refresh_links(
+        self, links: Iterable["InternetLink"], force: bool = True
+    ) -> None:
+        """
+        Probe the specified links and update only the affected entities.
+
+        Each link is evaluated, published and rescheduled as soon as its probe
+        completes, so a slow or down link does not delay the others. Links
+        with a probe already in progress are skipped, and are updated when
+        that probe completes. If a full update is pending, the status of all
+        links is re-evaluated, even if no links are probed.
+        """
+        start_ns = time.perf_counter_ns()
+        links = set(links) - self._probing
+        self._probing.update(links)
+        tasks = {asyncio.create_task(link.async_update(force)): link for link in links}
+        try:
+            if not tasks:
+                self._async_update_status(())
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                done_links = set()
+                for task in done:
+                    done_links.add(link := tasks.pop(task))
+                    if exc := task.exception():
+                        _LOGGER.error(
+                            "%s: unexpected error probing link",
+                            link.name,
+                            exc_info=exc,
+                        )
+                self._probing.difference_update(done_links)
+                self._async_update_status(done_links)
+                self._async_schedule_next()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._probing.difference_update(tasks.values())
+            self._async_schedule_next()
+        self._async_cycle_done(start_ns)
+
+    @callback
+    def async_request_link_update(self, link: "InternetLink") -> None:
+        """Request an immediate update of a link outside of its schedule."""
+        _LOGGER.debug("%s: link update requested", link.name)
+        self.entry.async_create_background_task(
+            self.hass,
+            self.async_refresh_links([link]),
+            f"{DOMAIN} {link.name} update",
+        )
+
+    @callback
+    def _async_update_status(self, links: set["InternetLink"]) -> None:
+        """Update status for probed links and notify the affected entities."""
+        internet_status = self.internet_status
+        contexts: set[Any] = set(links)
+        try:
+            status_start_ns = time.perf_counter_ns()
+            if self._full_update:
+                contexts.update(self.update_internet_status())
+                contexts.update(self.links.links_all.values())
+                self._full_update = False
+            else:
+                contexts.update(self.update_internet_status(links))
+            self.instrumentation.record(STAGE_STATUS, status_start_ns)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("unexpected error updating links")
+        if self.internet_status != internet_status:
+            contexts.add(self)
+        for link in links:
+            self._schedule_push(link.next_update, SCHEDULE_PROBE, link)
+        self.async_update_listeners_for(contexts)
+
+    def set_configured_ip(self) -> set["InternetLink"]:
+        """
+        Set configured IP for links that do not have a configured IP.
+
+        Returns the links whose configured IP was set.
+        """
+        updated = {
+            link
+            for link in self.links.links_all.values()
+            if link.configured_ip is None and link.current_ip
+        }
+        for link in updated:
+            link.set_configured_ip()
         self._configured_ip_updated = True
+        self._failover_index.update(updated)
+        return updated
 
     def reset_configured_ip(self) -> None:
         """Reset configured IP for all links."""
         self._configured_ip_updated = False
         for link in self.links.links_all.values():
             link.reset_configured_ip()
+        self._full_update = True  ## re-evaluate failover for all links
+
+    async def async_reset_configured_ip(self) -> None:
+        """Reset configured IP for all links and re-evaluate without probing."""
+        self.reset_configured_ip()
+        await self.async_refresh_links(())
 
 
 class InternetLink(ABC):
@@ -263,6 +737,16 @@ class InternetLink(ABC):
     link_failover: None = link failover is not checked for this link
                    False = link is not failed over
                    True = current IP address for link is the configured IP of another link
+
+    If max_scan_interval is configured, the scan interval adapts to the link:
+    after a run of stable probes it backs off towards max_scan_interval, and
+    when the link status or IP address changes or the rtt deviates from its
+    baseline, the link is re-probed after the short confirm_interval.
+
+    If phi_threshold is configured, a phi-accrual failure detector fed by the
+    successful probes of the link decides whether a failed probe marks the
+    link down. The link stays up with its last known IP address until the
+    suspicion level phi reaches the threshold.
     """
 
     def __init__(
@@ -271,8 +755,26 @@ class InternetLink(ABC):
         self.name = name
         self.link_type = link_type
         self.link_config = link_config
-        self.probe_target: str = link_config[CONF_PROBE_TARGET]
+        probe_target = link_config[CONF_PROBE_TARGET]
+        ## DNS probe types accept a list of equivalent probe servers
+        self.probe_targets: list[str] = (
+            probe_target if isinstance(probe_target, list) else [probe_target]
+        )
+        self.probe_target: str = self.probe_targets[0]
         self.scan_interval: float = link_config[CONF_SCAN_INTERVAL]
+        self.max_scan_interval: float | None = link_config.get(CONF_MAX_SCAN_INTERVAL)
+        self.confirm_interval: float = min(
+            link_config.get(CONF_CONFIRM_INTERVAL, DEFAULTS[CONF_CONFIRM_INTERVAL]),
+            self.scan_interval,
+        )
+        self.current_scan_interval = self.scan_interval
+        self._stable_probes = 0
+        self._rtt_baseline: float | None = None
+        self.phi_threshold: float | None = link_config.get(CONF_PHI_THRESHOLD)
+        self.phi: float | None = None
+        self.failure_detector: PhiAccrualDetector | None = None
+        if self.phi_threshold:
+            self.failure_detector = PhiAccrualDetector(self.scan_interval, PHI_WINDOW)
         self.configured_ip: str | None = link_config.get(CONF_CONFIGURED_IP)
         self._config_configured_ip = self.configured_ip
         self.link_failover: bool | None = None
@@ -280,18 +782,76 @@ class InternetLink(ABC):
         self.current_ip: str | None = None
         self.reverse_hostname: str | None = None
         self._reverse_ok: bool | None = None  ## TODO: review needed?
-        self._next_update = datetime.now(UTC)
+        self.next_update = time.monotonic()
+        self.rtt: float | None = None
+        self.rtt_array: list[float] | None = None
+        self.rtt_update_interval: float | None = None
+        self.rtt_next_update: float | None = None
+        self.rtt_publish = False
+        self.rtt_context = (self, CONF_RTT_SENSOR)
+        self.rtt_stats: RttStats | None = None
+        self.rtt_window: RttWindow | None = None
+        self.rtt_statistics: RttHourlyStats | None = None
+        self.rtt_statistic_id: str | None = None
+        self.update_callback: Callable[[InternetLink], None] | None = None
+        self.instrumentation: Instrumentation | None = None
+        self.history: RttHistory | None = None
+        self.history_id = name_hash(name)
+        self.probe_hub: ProbeHub | None = None
+        self.probe_losses = 0
         _LOGGER.debug(
             "creating link %s(%s): link_type=%s, probe_target=%s, "
-            "scan_interval=%s, configured_ip=%s",
+            "scan_interval=%s, max_scan_interval=%s, configured_ip=%s",
             name,
             self.__class__.__name__,
             link_type,
             self.probe_target,
             self.scan_interval,
+            self.max_scan_interval,
             self.configured_ip,
         )
 
+    def setup_rtt_sensor(self, link_config: dict[str, Any]) -> None:
+        """Enable the RTT sensor for the link if configured."""
+        if CONF_RTT_SENSOR not in link_config:
+            return
+        rtt_sensor_config: dict[str, Any] = link_config[CONF_RTT_SENSOR] or {}
+        self.rtt_update_interval = rtt_sensor_config.get(
+            CONF_UPDATE_INTERVAL, DEFAULTS[CONF_RTT_SENSOR][CONF_UPDATE_INTERVAL]
+        )
+        self.rtt_next_update = time.monotonic() + self.rtt_update_interval
+        self.rtt_publish = True
+        self.rtt_stats = RttStats(
+            rtt_sensor_config.get(CONF_SAMPLES, DEFAULTS[CONF_RTT_SENSOR][CONF_SAMPLES])
+        )
+        self.rtt_window = RttWindow()
+        if rtt_sensor_config.get(
+            CONF_STATISTICS, DEFAULTS[CONF_RTT_SENSOR][CONF_STATISTICS]
+        ):
+            self.rtt_statistics = RttHourlyStats()
+
+    def close(self) -> None:
+        """Release resources held by the link."""
+
+    def record_rtt(self, rtt: float, ip: str | None = None) -> None:
+        """Record the rtt of a successful probe for the RTT sensor and history."""
+        if self.rtt_stats:
+            self.rtt_stats.add(rtt)
+            self.rtt_window.add(rtt)
+            if self.rtt_statistics:
+                self.rtt_statistics.add(rtt)
+        if self.history:
+            self.history.record(self.history_id, rtt, ip)
+
+    def record_loss(self, count: int = 1) -> None:
+        """Record probes that received no response for the RTT sensor and history."""
+        self.probe_losses += count
+        if self.rtt_stats and count:
+            self.rtt_stats.add_loss(count)
+        if self.history:
+            for _ in range(count):
+                self.history.record(self.history_id, None, None)
+
     def set_configured_ip(self) -> None:
         """Set configured IP for the link."""
         if self.current_ip is not None:
@@ -315,137 +875,597 @@ class InternetLink(ABC):
         self.configured_ip = self._config_configured_ip
         self.link_up = bool(self.current_ip)
 
+    def state_to_store(self) -> dict[str, Any]:
+        """Return the link state to persist across restarts."""
+        return {
+            ## Only configured IPs learned at runtime are persisted
+            "configured_ip": (
+                self.configured_ip if self._config_configured_ip is None else None
+            ),
+            "current_ip": self.current_ip,
+            "link_up": self.link_up,
+            "link_failover": self.link_failover,
+            "rtt": self.rtt,
+            "rtt_stats": self.rtt_stats.to_dict() if self.rtt_stats else None,
+            "rtt_statistics": (
+                self.rtt_statistics.to_dict() if self.rtt_statistics else None
+            ),
+        }
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        """Restore the link state persisted before the last restart."""
+        if self._config_configured_ip is None:
+            self.configured_ip = state.get("configured_ip")
+        self.current_ip = state.get("current_ip")
+        self.link_up = state.get("link_up")
+        self.link_failover = state.get("link_failover")
+        self.rtt = state.get("rtt")
+        if self.rtt_stats and (rtt_stats := state.get("rtt_stats")):
+            self.rtt_stats.restore(rtt_stats)
+        if self.rtt_statistics and (rtt_statistics := state.get("rtt_statistics")):
+            self.rtt_statistics.restore(rtt_statistics)
+        _LOGGER.debug(
+            "%s: restored state: configured_ip=%s, current_ip=%s, link_up=%s",
+            self.name,
+            self.configured_ip,
+            self.current_ip,
+            self.link_up,
+        )
+
     async def async_probe(self) -> bool | None:
         """Probe Internet link. (stub)"""
         raise RuntimeError("probe not implemented")
 
+    async def async_evaluate_probe(self) -> bool | None:
+        """Return the link status for the current IP address of the last probe."""
+        if self.current_ip is None:
+            return False
+        if self.configured_ip is None or self.current_ip == self.configured_ip:
+            return True
+        return None
+
+    def probe_key(self) -> tuple | None:
+        """Return the key identifying probes that can be shared with other links."""
+        return None
+
+    async def async_probe_shared(self, force: bool = False) -> bool | None:
+        """
+        Probe the link, sharing the probe with links of any entry.
+
+        If the probe hub has a result for the same probe that is in progress,
+        or younger than PROBE_HUB_MAX_AGE_RATIO of the scan interval, the
+        result is evaluated by this link instead of probing again. A forced
+        probe only joins a probe that is in progress.
+        """
+        if self.probe_hub is None or (key := self.probe_key()) is None:
+            return await self.async_probe()
+        link_up = None
+
+        async def async_probe() -> ProbeSnapshot:
+            nonlocal link_up
+            self.probe_losses = 0
+            link_up = await self.async_probe()
+            return ProbeSnapshot(
+                self.current_ip, self.rtt, list(self.rtt_array or ()), self.probe_losses
+            )
+
+        max_age = 0.0 if force else self.current_scan_interval * PROBE_HUB_MAX_AGE_RATIO
+        snapshot, shared = await self.probe_hub.async_probe(key, max_age, async_probe)
+        if not shared:
+            return link_up
+        _LOGGER.debug(
+            "%s: using shared probe: current_ip=%s", self.name, snapshot.current_ip
+        )
+        self.current_ip = snapshot.current_ip
+        self.rtt = snapshot.rtt
+        self.rtt_array = list(snapshot.rtt_array)
+        for rtt in self.rtt_array:
+            self.record_rtt(rtt, self.current_ip)
+        self.record_loss(snapshot.losses)
+        return await self.async_evaluate_probe()
+
+    def _rtt_deviated(self) -> bool:
+        """Update the rtt baseline and return whether the rtt deviates from it."""
+        if self.rtt is None:
+            return False
+        if (baseline := self._rtt_baseline) is None:
+            self._rtt_baseline = self.rtt
+            return False
+        self._rtt_baseline += ADAPTIVE_RTT_SMOOTHING * (self.rtt - baseline)
+        return (
+            self.rtt > baseline * ADAPTIVE_RTT_DEVIATION
+            and self.rtt - baseline > ADAPTIVE_RTT_MIN_DEVIATION
+        )
+
+    def adapt_scan_interval(self, changed: bool) -> float:
+        """Return the scan interval following a probe in adaptive mode."""
+        deviated = self._rtt_deviated()
+        if changed or deviated:
+            ## Confirm the change quickly
+            self._stable_probes = 0
+            interval = self.confirm_interval
+        else:
+            self._stable_probes += 1
+            interval = self.scan_interval
+            if self.link_up and self._stable_probes > ADAPTIVE_STABLE_PROBES:
+                interval = min(
+                    max(self.current_scan_interval, self.scan_interval)
+                    * ADAPTIVE_BACKOFF,
+                    self.max_scan_interval,
+                )
+        if interval != self.current_scan_interval:
+            _LOGGER.debug("%s: scan interval: %.1fs", self.name, interval)
+        self.current_scan_interval = interval
+        return interval
+
+    def detect_failure(
+        self, link_up: bool | None, previous_ip: str | None
+    ) -> bool | None:
+        """Return the link status judged by the phi-accrual failure detector."""
+        detector = self.failure_detector
+        current_time = time.monotonic()
+        if self.current_ip is not None:
+            detector.heartbeat(current_time, self.rtt)
+        self.phi = round(detector.phi(current_time), 2)
+        if (
+            self.current_ip is None
+            and detector.last_heartbeat is not None
+            and self.link_up is not False
+            and self.phi < self.phi_threshold
+        ):
+            ## Probe failed, but not yet suspected
+            _LOGGER.debug(
+                "%s: probe failed, phi %.2f below threshold", self.name, self.phi
+            )
+            self.current_ip = previous_ip
+            return self.link_up
+        return link_up
+
     async def async_update(self, full_update: bool = False) -> bool:
         """Update status of link."""
-        current_time = datetime.now(UTC)
-        if full_update or self._next_update <= current_time:
+        current_time = time.monotonic()
+        if full_update or self.next_update <= current_time + SCHEDULE_TOLERANCE:
             _LOGGER.debug("%s: probing link", self.name)
-            self._next_update = current_time + timedelta(seconds=self.scan_interval)
+            self.next_update = current_time + self.current_scan_interval
             current_ip = self.current_ip
-            link_up = await self.async_probe()
+            start_ns = time.perf_counter_ns()
+            link_up = await self.async_probe_shared(full_update)
+            if self.instrumentation:
+                self.instrumentation.record(PROBE_PREFIX + self.name, start_ns)
+            probe_failed = self.current_ip is None
+            if self.failure_detector:
+                link_up = self.detect_failure(link_up, current_ip)
             if self.link_failover and current_ip == self.current_ip:
                 ## Link previously marked as failed over and IP has not changed
                 link_up = None
+            ## A failed probe that is not yet suspected also needs confirming
+            changed = (
+                (probe_failed and link_up is not False)
+                or link_up != self.link_up
+                or current_ip != self.current_ip
+            )
             if link_up != self.link_up:
                 _LOGGER.info("%s: link_status: %s", self.name, link_up)
             self.link_up = link_up
+            if self.max_scan_interval:
+                self.next_update = current_time + self.adapt_scan_interval(changed)
             return True
-        next_update_in = self._next_update - current_time
-        _LOGGER.debug("%s: skipping, next update in: %s", self.name, next_update_in)
+        next_update_in = self.next_update - current_time
+        _LOGGER.debug("%s: skipping, next update in: %.3fs", self.name, next_update_in)
         return False
 
 
 class ProbeFileLink(InternetLink):
-    """Internet link with file probe."""
+    """
+    Internet link with file probe.
+
+    The file is only read when its stat signature has changed, otherwise the
+    last IP address read is reused. With watch enabled, the file is watched
+    with inotify and only checked when it has been written or removed, and an
+    immediate update is requested for the link. The link is down while the
+    file cannot be read.
+    """
+
+    def __init__(
+        self, name: str, link_type: LinkType, link_config: dict[str, Any]
+    ) -> None:
+        super().__init__(name, link_type, link_config)
+        self._watch: bool = link_config.get(CONF_WATCH, DEFAULTS[CONF_WATCH])
+        self._watcher: FileWatcher | None = None
+        self._file_changed = True
+        self._file_error = False
+        self._reader = FileReader(self.probe_target)
+
+    def _start_watch(self) -> None:
+        """Start watching the probe file."""
+        self._watch = False  ## only attempt once
+        try:
+            self._watcher = FileWatcher(self.probe_target, self._handle_file_changed)
+            _LOGGER.debug("%s: watching %s", self.name, self.probe_target)
+        except FileWatchError as exc:
+            _LOGGER.warning(
+                "%s: cannot watch %s, polling instead: %s",
+                self.name,
+                self.probe_target,
+                exc,
+            )
+
+    def _handle_file_changed(self) -> None:
+        """Handle a write to or removal of the probe file."""
+        ## A same-size rewrite within one mtime tick has an unchanged stat signature
+        self._reader.invalidate()
+        self._file_changed = True
+        if self.update_callback:
+            self.update_callback(self)
+
+    def close(self) -> None:
+        """Stop watching and close the probe file."""
+        if self._watcher:
+            self._watcher.close()
+            self._watcher = None
+        self._reader.close()
 
     async def async_probe(self) -> bool | None:
         """Probe file for status."""
+        if self._watch:
+            self._start_watch()
+        if self._watcher is None or self._file_changed:
+            self._file_changed = False
+            try:
+                content = self._reader.read_if_changed()
+                self._file_error = False
+            except OSError as exc:
+                if not self._file_error:
+                    _LOGGER.warning(
+                        "%s: cannot read %s: %s", self.name, self.probe_target, exc
+                    )
+                    self._file_error = True
+                self._file_changed = True  ## retry on next poll
+                self._reader.close()
+                self.current_ip = None
+                return False
+            if content is not None:
+                current_ip = content.rstrip()
+                self.current_ip = current_ip if ip_address_family(current_ip) else None
+
+        return await self.async_evaluate_probe()
+
+    def probe_key(self) -> tuple | None:
+        """Return the key identifying probes that can be shared with other links."""
+        return (ProbeType.FILE, self.probe_target)
+
+
+class ProbeStatusFileLink(InternetLink):
+    """
+    Internet link with status file probe.
+
+    The status file holds the current IP address, and optionally the rtt,
+    for multiple links. Each link looks up its entry using status_key, which
+    defaults to the link name.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        link_type: LinkType,
+        link_config: dict[str, Any],
+        status_file: StatusFile | None = None,
+    ) -> None:
+        super().__init__(name, link_type, link_config)
+        self.status_file = status_file or StatusFile(self.probe_target)
+        self.status_key: str = link_config.get(CONF_STATUS_KEY, name)
+        self._status_file_error = False
 
-        async with aiofiles.open(
-            self.probe_target, "r", encoding="utf8", errors="surrogateescape"
-        ) as fileh:
-            current_ip = (await fileh.read()).rstrip()
+        _LOGGER.debug(
+            "creating link %s(%s): status_key=%s",
+            name,
+            self.__class__.__name__,
+            self.status_key,
+        )
+
+        ## Enable RTT sensor
+        self.setup_rtt_sensor(link_config)
+
+    def close(self) -> None:
+        """Close the status file."""
+        self.status_file.close()
+
+    async def async_probe(self) -> bool | None:
+        """Look up link status in status file."""
+        self.current_ip = None
+        self.rtt = None
+        self.rtt_array = []
+        try:
+            statuses = await self.status_file.async_read()
+            self._status_file_error = False
+        except (OSError, ValueError) as exc:
+            if not self._status_file_error:
+                _LOGGER.warning(
+                    "%s: cannot read status file %s: %s",
+                    self.name,
+                    self.status_file.path,
+                    exc,
+                )
+                self._status_file_error = True
+            return False
 
-        if not dns.inet.is_address(current_ip):
-            self.current_ip = None
+        current_ip, rtt = statuses.get(self.status_key, (None, None))
+        if not current_ip or not ip_address_family(current_ip):
+            _LOGGER.debug(
+                "%s: no valid IP address for %s in status file",
+                self.name,
+                self.status_key,
+            )
             return False
 
         self.current_ip = current_ip
-        if self.configured_ip is None or self.current_ip == self.configured_ip:
-            return True
-        return None
+        if rtt is not None:
+            self.rtt = rtt
+            self.rtt_array = [rtt]
+            self.record_rtt(rtt)
+        return await self.async_evaluate_probe()
+
+    def probe_key(self) -> tuple | None:
+        """Return the key identifying probes that can be shared with other links."""
+        return (ProbeType.STATUS_FILE, self.probe_target, self.status_key)
 
 
 class ProbeDNSLink(InternetLink, ABC):
     """Internet link with DNS probe."""
 
     probe_type = None
+    probe_qname: str = None
+    probe_qtype: int = None
 
     def __init__(
         self,
         name: str,
         link_type: LinkType,
         link_config: dict[str, Any],
+        dns_probe_engine: DNSProbeEngine | None = None,
+        reverse_lookup_cache: ReverseLookupCache | None = None,
     ) -> None:
         super().__init__(name, link_type, link_config)
         self.reverse_hostname: str | None = link_config.get(CONF_REVERSE_HOSTNAME)
         self._timeout: float = link_config[CONF_TIMEOUT]
         self._retries: int = link_config[CONF_RETRIES]
+        self._hedge_delay: float | None = link_config.get(CONF_HEDGE_DELAY)
+        self._quorum: int = min(
+            link_config.get(CONF_QUORUM, DEFAULTS[CONF_QUORUM]), self._retries
+        )
         self._reverse_hostname_error: bool = False
-        self.rtt: float | None = None
-        self.rtt_array: list[float] | None = None
-        self.rtt_update_interval: float | None = None
-        self.rtt_next_update: datetime | None = None
 
-        ## Create resolver for public IP address DNS query
-        resolver = dns.asyncresolver.Resolver()
-        resolver.nameservers = [self.probe_target]
-        resolver.timeout = self._timeout
-        self.resolver = resolver
+        ## Prepare public IP address DNS query for the shared probe engine
+        self.dns_probe_engine = dns_probe_engine or DNSProbeEngine()
+        self.probe_servers = [DNSProbeServer(target) for target in self.probe_targets]
+        ## Hedged probes are sent together, and each may race every server
+        self._probes_in_flight = (
+            self._retries if self._hedge_delay is not None else 1
+        ) * len(self.probe_servers)
+        self.dns_probe_engine.reserve_probes(self._probes_in_flight)
+        self._probe_query = build_query(self.probe_qname, self.probe_qtype)
+        if self.reverse_hostname and reverse_lookup_cache is None:
+            reverse_lookup_cache = ReverseLookupCache()
+        self.reverse_lookup_cache = reverse_lookup_cache
 
         _LOGGER.debug(
-            "creating link %s(%s): reverse_hostname=%s, retries=%d, timeout=%f",
+            "creating link %s(%s): reverse_hostname=%s, retries=%d, timeout=%f, "
+            "hedge_delay=%s, quorum=%d",
             name,
             self.__class__.__name__,
             self.reverse_hostname,
             self._retries,
             self._timeout,
+            self._hedge_delay,
+            self._quorum,
         )
 
         ## Enable RTT sensor
-        if CONF_RTT_SENSOR in link_config:
-            rtt_sensor_config: dict[str, Any] = link_config[CONF_RTT_SENSOR] or {}
-            self.rtt_update_interval = rtt_sensor_config.get(
-                CONF_UPDATE_INTERVAL, DEFAULTS[CONF_RTT_SENSOR][CONF_UPDATE_INTERVAL]
+        self.setup_rtt_sensor(link_config)
+
+    def close(self) -> None:
+        """Release the receive buffer space reserved for the probes of the link."""
+        self.dns_probe_engine.reserve_probes(-self._probes_in_flight)
+
+    def parse_answers(self, answers: list[str]) -> str | None:
+        """Return the public IP address from the DNS probe answers."""
+        return answers[0] if answers else None
+
+    async def async_query_server(
+        self, server: DNSProbeServer, timeout: float
+    ) -> tuple[str | None, float]:
+        """Send DNS probe to a server and return the public IP address and rtt."""
+        start = time.monotonic()
+        try:
+            answers, rtt = await self.dns_probe_engine.async_query(
+                server.family,
+                server.address,
+                self._probe_query,
+                self.probe_qtype,
+                timeout,
+                self.instrumentation,
+            )
+        except asyncio.CancelledError:
+            ## Outraced by another server, the time waited is a lower bound
+            waited = (time.monotonic() - start) * 1000
+            if server.srtt is None or waited > server.srtt:
+                server.record_rtt(waited)
+            raise
+        except DNSProbeError:
+            server.record_rtt(self._timeout * 1000)
+            raise
+        probe_ip = self.parse_answers(answers)
+        server.record_rtt(rtt if probe_ip is not None else self._timeout * 1000)
+        return probe_ip, rtt
+
+    async def async_send_dns_probe(self) -> tuple[str | None, float]:
+        """Send DNS probe and return the public IP address and rtt."""
+        if len(self.probe_servers) == 1:
+            return await self.async_query_server(self.probe_servers[0], self._timeout)
+        return await self.async_race_dns_probe()
+
+    async def async_race_dns_probe(self) -> tuple[str | None, float]:
+        """
+        Race the DNS probe across the probe servers of the link.
+
+        Servers are queried in order of smoothed rtt. The next server is
+        queried when the previous server fails, or has not responded within
+        a multiple of its smoothed rtt (or its share of the remaining timeout,
+        if sooner). The first valid answer is returned, and all servers share
+        the probe timeout.
+        """
+        servers = sorted(self.probe_servers, key=DNSProbeServer.rank)
+        deadline = time.monotonic() + self._timeout
+        pending: set[asyncio.Task] = set()
+        result: tuple[str | None, float] | None = None
+        error: DNSProbeError | None = None
+        try:
+            while servers or pending:
+                delay = None
+                if servers and (timeout := deadline - time.monotonic()) > 0:
+                    server = servers.pop(0)
+                    pending.add(
+                        asyncio.create_task(self.async_query_server(server, timeout))
+                    )
+                    if servers:
+                        ## Leave time for the remaining servers to respond
+                        delay = server.race_delay(timeout / (len(servers) + 1))
+                elif not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        probe_ip, rtt = task.result()
+                    except DNSProbeError as exc:
+                        error = exc
+                        continue
+                    if probe_ip is not None:
+                        return probe_ip, rtt
+                    result = (probe_ip, rtt)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        if result is not None:
+            return result
+        raise error or DNSProbeTimeout(f"no response from {self.probe_targets}")
+
+    async def async_send_probe(self, count: int) -> tuple[str | None, float | None]:
+        """Send a single DNS probe and return the probe IP and rtt."""
+        probe_host = ", ".join(self.probe_targets)
+        try:
+            probe_ip, rtt = await self.async_send_dns_probe()
+        except DNSProbeError as exc:
+            _LOGGER.debug(
+                "%s: probe %d failed: probe_type=%s, probe_host=%s: %s",
+                self.name,
+                count,
+                self.__class__.__name__,
+                probe_host,
+                exc,
             )
-            self.rtt_next_update = datetime.now(UTC)
+            self.record_loss()
+            return None, None
 
-    async def async_send_dns_probe(self):
-        """Send DNS probe. (stub)"""
-        raise RuntimeError("send_dns_probe not implemented")
+        if probe_ip is not None:
+            self.record_rtt(rtt, probe_ip)
+        else:
+            self.record_loss()
+        if probe_ip is not None:
+            _LOGGER.debug(
+                "%s: probe %d success: probe_type=%s, probe_host=%s, "
+                "current_ip=%s, rtt=%fs",
+                self.name,
+                count,
+                self.__class__.__name__,
+                probe_host,
+                probe_ip,
+                rtt,
+            )
+        return probe_ip, rtt
 
-    async def async_probe(self) -> bool | None:
-        """Send DNS probes and update rtt."""
-        probe_host = self.probe_target
+    async def async_probe_sequential(self) -> str | None:
+        """Send DNS probes one after another, spaced by the timeout."""
         current_ip = None
-        self.rtt_array = []
         for count in range(self._retries, 0, -1):
-            start_time = datetime.now(UTC)
-            try:
-                probe_ip = await self.async_send_dns_probe()
-            except dns.exception.DNSException as exc:
-                _LOGGER.debug(
-                    "%s: probe %d failed: probe_type=%s, probe_host=%s: %s",
-                    self.name,
-                    count,
-                    self.__class__.__name__,
-                    probe_host,
-                    exc,
-                )
-                continue
-
+            probe_ip, rtt = await self.async_send_probe(count)
             if probe_ip is not None:
                 current_ip = probe_ip
-                rtt = round(
-                    (datetime.now(UTC) - start_time) / timedelta(milliseconds=1), 3
-                )
                 self.rtt_array.append(rtt)
-                _LOGGER.debug(
-                    "%s: probe %d success: probe_type=%s, probe_host=%s, "
-                    "current_ip=%s, rtt=%fs",
-                    self.name,
-                    count,
-                    self.__class__.__name__,
-                    probe_host,
-                    current_ip,
-                    rtt,
-                )
-            if count > 1 and rtt < self._timeout * 1000:
+            if count > 1 and rtt is not None and rtt < self._timeout * 1000:
                 await asyncio.sleep(self._timeout - rtt / 1000)
+        return current_ip
+
+    async def async_probe_hedged(self) -> str | None:
+        """
+        Send DNS probes concurrently, staggered by the hedge delay.
+
+        The next probe is sent when the hedge delay expires or an earlier probe
+        completes. No more probes are sent once a quorum of probes return the
+        same IP address, and probes in flight are given HEDGE_GRACE_PERIOD to
+        complete so that their rtts are included. Otherwise the IP address
+        returned most often is used.
+        """
+        answers: dict[str, int] = {}
+        pending: set[asyncio.Task] = set()
+        remaining = self._retries
+        quorum_ip = None
+
+        def collect(done: set[asyncio.Task]) -> None:
+            """Collect the answers and rtts of completed probes."""
+            for task in done:
+                probe_ip, rtt = task.result()
+                if probe_ip is not None:
+                    self.rtt_array.append(rtt)
+                    answers[probe_ip] = answers.get(probe_ip, 0) + 1
+
+        try:
+            while remaining or pending:
+                if remaining:
+                    pending.add(asyncio.create_task(self.async_send_probe(remaining)))
+                    remaining -= 1
+                    if remaining and not self._hedge_delay:
+                        continue  ## send all probes at once
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self._hedge_delay if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                collect(done)
+                quorum_ip = next(
+                    (ip for ip, count in answers.items() if count >= self._quorum),
+                    None,
+                )
+                if quorum_ip is not None:
+                    _LOGGER.debug(
+                        "%s: probe quorum reached: current_ip=%s, answers=%d",
+                        self.name,
+                        quorum_ip,
+                        answers[quorum_ip],
+                    )
+                    if pending:
+                        done, pending = await asyncio.wait(
+                            pending, timeout=HEDGE_GRACE_PERIOD
+                        )
+                        collect(done)
+                    return quorum_ip
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        return max(answers, key=answers.get) if answers else None
+
+    async def async_probe(self) -> bool | None:
+        """Send DNS probes and update rtt."""
+        self.rtt_array = []
+        if self._hedge_delay is None:
+            current_ip = await self.async_probe_sequential()
+        else:
+            current_ip = await self.async_probe_hedged()
         if self.rtt_array:
             self.rtt = round(sum(self.rtt_array) / len(self.rtt_array), 3)
             _LOGGER.debug("%s: average rtt=%fs", self.name, self.rtt)
@@ -453,12 +1473,31 @@ class ProbeDNSLink(InternetLink, ABC):
             self.rtt = None
 
         self.current_ip = current_ip
-        if current_ip is None:
+        return await self.async_evaluate_probe()
+
+    def probe_key(self) -> tuple | None:
+        """Return the key identifying probes that can be shared with other links."""
+        return (
+            self.probe_type,
+            tuple(self.probe_targets),
+            self._retries,
+            self._timeout,
+            self._hedge_delay,
+            self._quorum,
+        )
+
+    async def async_evaluate_probe(self) -> bool | None:
+        """Return the link status for the current IP address of the last probe."""
+        if self.current_ip is None:
             return False
-        if self.configured_ip and current_ip != self.configured_ip:
+        if self.configured_ip and self.current_ip != self.configured_ip:
             return None
         if self.reverse_hostname:
-            return True if await self.check_dns_reverse_lookup() else None
+            start_ns = time.perf_counter_ns()
+            reverse_ok = await self.check_dns_reverse_lookup()
+            if self.instrumentation:
+                self.instrumentation.record(STAGE_REVERSE_LOOKUP, start_ns)
+            return True if reverse_ok else None
         return True
 
     async def check_dns_reverse_lookup(self):
@@ -467,9 +1506,8 @@ class ProbeDNSLink(InternetLink, ABC):
         current_ip = self.current_ip
         # timeout = self._timeout
         try:
-            answer = await dns.asyncresolver.resolve_address(current_ip)
+            ptr_data = await self.reverse_lookup_cache.async_resolve(current_ip)
             self._reverse_hostname_error = False
-            ptr_data = str(answer[0])
             if reverse_hostname in ptr_data:
                 _LOGGER.debug(
                     "%s: reverse lookup success: %s in %s",
@@ -485,7 +1523,7 @@ class ProbeDNSLink(InternetLink, ABC):
                 ptr_data,
             )
             return False
-        except dns.exception.DNSException as exc:
+        except ReverseLookupError as exc:
             if not self._reverse_hostname_error:
                 _LOGGER.warning(
                     "%s: reverse lookup for %s failed: %s",
@@ -501,15 +1539,14 @@ class ProbeGoogleDNSLink(ProbeDNSLink):
     """Internet link with Google DNS probe."""
 
     probe_type = "google"
+    ## dig @ns1.google.com TXT o-o.myaddr.l.google.com +short
+    probe_qname = "o-o.myaddr.l.google.com"
+    probe_qtype = QTYPE_TXT
 
-    async def async_send_dns_probe(self) -> str:
-        """Probe public IP address using Google DNS."""
+    def parse_answers(self, answers: list[str]) -> str | None:
+        """Return the public IP address from the Google DNS TXT answers."""
         current_ip = None
-        ## dig @ns1.google.com TXT o-o.myaddr.l.google.com +short
-        for rdata in await self.resolver.resolve(
-            "o-o.myaddr.l.google.com", dns.rdatatype.TXT
-        ):
-            txt = rdata.strings[0].decode("utf-8")
+        for txt in answers:
             ## Handle edns response, though this may only provide subnet level IP resolution
             if txt.startswith("edns0-client-subnet"):
                 current_ip = txt[20:-3]
@@ -522,30 +1559,18 @@ class ProbeOpenDNSLink(ProbeDNSLink):
     """Internet link with OpenDNS probe."""
 
     probe_type = "opendns"
-
-    async def async_send_dns_probe(self) -> str:
-        """Obtain public IP address using a probe."""
-        current_ip = None
-        ## dig @resolver1.opendns.com ANY myip.opendns.com +short
-        for rdata in await self.resolver.resolve("myip.opendns.com", dns.rdatatype.A):
-            current_ip = rdata.address
-            break
-        return current_ip
+    ## dig @resolver1.opendns.com ANY myip.opendns.com +short
+    probe_qname = "myip.opendns.com"
+    probe_qtype = QTYPE_A
 
 
 class ProbeAkamaiDNSLink(ProbeDNSLink):
     """Internet link with Akamai DNS probe."""
 
     probe_type = "akamai"
-
-    async def async_send_dns_probe(self) -> str:
-        """Probe public IP address using Akamai DNS."""
-        current_ip = None
-        ## dig @ns1-1.akamaitech.net ANY whoami.akamai.net +short
-        for rdata in await self.resolver.resolve("whoami.akamai.net", dns.rdatatype.A):
-            current_ip = rdata.address
-            break
-        return current_ip
+    ## dig @ns1-1.akamaitech.net ANY whoami.akamai.net +short
+    probe_qname = "whoami.akamai.net"
+    probe_qtype = QTYPE_A
 
 
 PROBE_TYPE_CLASS_MAP: dict[ProbeType, InternetLink] = {
@@ -556,21 +1581,24 @@ PROBE_TYPE_CLASS_MAP: dict[ProbeType, InternetLink] = {
 
 
 class ProbePingLink(InternetLink):
-    """Internet link with Ping probe."""
+    """
+    Internet link with Ping probe.
+
+    Echo requests are sent by the ICMP probe engine shared by all ping links,
+    which interleaves the echo requests of links that are probed together.
+    """
 
     def __init__(
         self,
         name: str,
         link_type: LinkType,
         link_config: dict[str, Any],
+        icmp_probe_engine: ICMPProbeEngine | None = None,
     ) -> None:
         super().__init__(name, link_type, link_config)
         self._timeout: float = link_config[CONF_TIMEOUT]
         self._retries: int = link_config[CONF_RETRIES]
-        self.rtt: float | None = None
-        self.rtt_array: list[float] | None = None
-        self.rtt_update_interval: float | None = None
-        self.rtt_next_update: datetime | None = None
+        self.icmp_probe_engine = icmp_probe_engine or ICMPProbeEngine()
 
         _LOGGER.debug(
             "creating link %s(%s): retries=%d, timeout=%f",
@@ -581,12 +1609,18 @@ class ProbePingLink(InternetLink):
         )
 
         ## Enable RTT sensor
-        if CONF_RTT_SENSOR in link_config:
-            rtt_sensor_config: dict[str, Any] = link_config[CONF_RTT_SENSOR] or {}
-            self.rtt_update_interval = rtt_sensor_config.get(
-                CONF_UPDATE_INTERVAL, DEFAULTS[CONF_RTT_SENSOR][CONF_UPDATE_INTERVAL]
-            )
-            self.rtt_next_update = datetime.now(UTC)
+        self.setup_rtt_sensor(link_config)
+
+    async def async_resolve_probe_target(self) -> tuple[int, str]:
+        """Resolve the probe target to an address family and IP address."""
+        probe_host = self.probe_target
+        if family := ip_address_family(probe_host):
+            return family, probe_host
+        addrinfo = await asyncio.get_running_loop().getaddrinfo(
+            probe_host, None, type=socket.SOCK_RAW
+        )
+        family, _, _, _, sockaddr = addrinfo[0]
+        return family, sockaddr[0]
 
     async def async_probe(self) -> bool | None:
         """Send ping probes and update rtt."""
@@ -595,12 +1629,16 @@ class ProbePingLink(InternetLink):
         self.rtt = None
         self.rtt_array = []
         try:
-            data = await async_ping(
-                self.probe_target, count=self._retries, timeout=self._timeout
+            family, address = await self.async_resolve_probe_target()
+            data = await self.icmp_probe_engine.async_ping(
+                family, address, count=self._retries, timeout=self._timeout
             )
+            for rtt in data.rtts:
+                self.record_rtt(rtt, data.address)
+            self.record_loss(data.packets_sent - data.packets_received)
             if data.is_alive:
                 self.current_ip = data.address
-                self.rtt = data.max_rtt
+                self.rtt = max(data.rtts)
                 self.rtt_array = data.rtts
                 _LOGGER.debug(
                     "%s: probe success: probe_host=%s, average rtt=%fs",
@@ -615,7 +1653,7 @@ class ProbePingLink(InternetLink):
                     probe_host,
                 )
 
-        except NameLookupError as exc:
+        except (socket.gaierror, ICMPProbeError) as exc:
             _LOGGER.debug(
                 "%s: probe failed: probe_host=%s: %s",
                 self.name,
@@ -623,4 +1661,12 @@ class ProbePingLink(InternetLink):
                 exc,
             )
 
+        return await self.async_evaluate_probe()
+
+    def probe_key(self) -> tuple | None:
+        """Return the key identifying probes that can be shared with other links."""
+        return (ProbeType.PING, self.probe_target, self._retries, self._timeout)
+
+    async def async_evaluate_probe(self) -> bool | None:
+        """Return the link status for the current IP address of the last probe."""
         return bool(self.current_ip)
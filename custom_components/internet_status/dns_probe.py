@@ -0,0 +1,261 @@
+"""Shared UDP DNS probe engine for Internet Status."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+import asyncio
+import logging
+import secrets
+import socket
+import struct
+import time
+
+from .instrumentation import STAGE_PARSE, STAGE_SEND, STAGE_WAIT, Instrumentation
+from .probe_socket import ProbeSocket, ProbeTimestamp, probe_rtt
+
+_LOGGER = logging.getLogger(__name__)
+
+DNS_PORT = 53
+
+## Smoothing factor of the per-server rtt used to rank the servers of a link
+SERVER_RTT_SMOOTHING = 0.2
+## Delay before querying the next server, as a multiple of the smoothed rtt
+RACE_RTT_FACTOR = 2.0
+RACE_MIN_DELAY = 0.01
+## Socket receive buffer per response that may arrive at once, including the
+## kernel overhead of each datagram
+RECV_BUFFER_PER_PROBE = 2048
+
+QTYPE_A = 1
+QTYPE_TXT = 16
+QCLASS_IN = 1
+
+FLAGS_QR = 0x8000
+FLAGS_TC = 0x0200
+FLAGS_RD = 0x0100
+FLAGS_RCODE = 0x000F
+
+_HEADER = struct.Struct("!HHHHHH")
+_RR = struct.Struct("!HHIH")
+_TXID = struct.Struct("!H")
+
+
+class DNSProbeError(Exception):
+    """DNS probe failed."""
+
+
+class DNSProbeTimeout(DNSProbeError):
+    """DNS probe timed out."""
+
+
+@lru_cache(maxsize=None)
+def build_query(qname: str, qtype: int) -> bytes:
+    """Build the wire format of a DNS query, excluding the transaction ID."""
+    wire = bytearray(_HEADER.pack(0, FLAGS_RD, 1, 0, 0, 0)[2:])
+    for label in qname.rstrip(".").split("."):
+        label_bytes = label.encode("ascii")
+        wire.append(len(label_bytes))
+        wire += label_bytes
+    wire += b"\x00" + struct.pack("!HH", qtype, QCLASS_IN)
+    return bytes(wire)
+
+
+def _skip_name(data: bytes, offset: int) -> int:
+    """Return the offset following the encoded domain name at offset."""
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:  ## compression pointer
+            return offset + 2
+        offset += 1
+        if length == 0:
+            return offset
+        offset += length
+
+
+def parse_response(data: bytes, qtype: int) -> list[str]:
+    """Return the A or TXT answers of the requested type in a DNS response."""
+    try:
+        _, flags, qdcount, ancount, _, _ = _HEADER.unpack_from(data)
+        if not flags & FLAGS_QR:
+            raise DNSProbeError("response is not a DNS answer")
+        if flags & FLAGS_TC:
+            raise DNSProbeError("response truncated")
+        if rcode := flags & FLAGS_RCODE:
+            raise DNSProbeError(f"server returned rcode {rcode}")
+
+        offset = _HEADER.size
+        for _ in range(qdcount):
+            offset = _skip_name(data, offset) + 4
+        answers = []
+        for _ in range(ancount):
+            offset = _skip_name(data, offset)
+            rtype, rclass, _, rdlength = _RR.unpack_from(data, offset)
+            offset += _RR.size
+            rdata = data[offset : offset + rdlength]
+            offset += rdlength
+            if rclass != QCLASS_IN or rtype != qtype or len(rdata) != rdlength:
+                continue
+            if rtype == QTYPE_A and rdlength == 4:
+                answers.append(socket.inet_ntop(socket.AF_INET, rdata))
+            elif rtype == QTYPE_TXT and rdlength:
+                answers.append(rdata[1 : 1 + rdata[0]].decode("utf-8", "replace"))
+        return answers
+    except (IndexError, struct.error) as exc:
+        raise DNSProbeError("malformed DNS response") from exc
+
+
+def resolve_probe_addr(probe_target: str) -> tuple[int, str]:
+    """Resolve a probe target to an address family and IP address. (blocking)"""
+    try:
+        addrinfo = socket.getaddrinfo(
+            probe_target, DNS_PORT, type=socket.SOCK_DGRAM, proto=socket.IPPROTO_UDP
+        )
+    except socket.gaierror as exc:
+        raise ValueError(f"cannot resolve probe target {probe_target}") from exc
+    family, _, _, _, sockaddr = addrinfo[0]
+    return family, sockaddr[0]
+
+
+class DNSProbeServer:
+    """
+    DNS probe server of a link.
+
+    The smoothed rtt of the server is used to rank the servers of a link.
+    A failed query is counted as an rtt of the probe timeout, so a server that
+    stops responding is ranked behind responsive servers until it recovers.
+    """
+
+    def __init__(self, target: str) -> None:
+        self.target = target
+        self.family, self.address = resolve_probe_addr(target)
+        self.srtt: float | None = None
+
+    def record_rtt(self, rtt: float) -> None:
+        """Update the smoothed rtt (ms) of the server."""
+        if self.srtt is None:
+            self.srtt = rtt
+        else:
+            self.srtt += SERVER_RTT_SMOOTHING * (rtt - self.srtt)
+
+    def rank(self) -> float:
+        """Return the sort key of the server, with untried servers first."""
+        return -1.0 if self.srtt is None else self.srtt
+
+    def race_delay(self, max_delay: float) -> float:
+        """Return the delay (s) before racing the next server against this one."""
+        if self.srtt is None:
+            return max_delay
+        return min(max(self.srtt * RACE_RTT_FACTOR / 1000, RACE_MIN_DELAY), max_delay)
+
+
+class DNSProbeEngine:
+    """
+    DNS probe engine shared by all DNS probe links.
+
+    Queries from all links are multiplexed over one UDP socket per address
+    family. Responses are matched to queries by transaction ID and source
+    address, and only the answer section is parsed. The rtt is measured from
+    nanosecond send and receive timestamps, using kernel receive timestamps
+    where available, so that it excludes event loop delay and parsing.
+
+    Links reserve receive buffer space for the probes they may have in flight
+    at once, so that the responses to links probed together are not dropped
+    by the kernel when they arrive in a burst.
+    """
+
+    def __init__(self, port: int = DNS_PORT) -> None:
+        self.port = port
+        self._sockets: dict[int, ProbeSocket] = {}
+        self._probes = 0
+        self._resize_sockets = False
+        self._pending: dict[
+            tuple[int, str], asyncio.Future[tuple[bytes, ProbeTimestamp]]
+        ] = {}
+
+    def reserve_probes(self, count: int) -> None:
+        """Reserve (or release, if negative) receive buffer space for probes."""
+        self._probes += count
+        self._resize_sockets = True
+
+    def _get_socket(self, family: int) -> ProbeSocket:
+        """Return the probe socket for an address family."""
+        if self._resize_sockets:
+            ## Resized in the event loop, as links are created in the executor
+            self._resize_sockets = False
+            for probe_socket in self._sockets.values():
+                probe_socket.set_receive_buffer(self._probes * RECV_BUFFER_PER_PROBE)
+        if (probe_socket := self._sockets.get(family)) is None:
+            probe_socket = ProbeSocket(
+                family, socket.SOCK_DGRAM, socket.IPPROTO_UDP, self.handle_response
+            )
+            _LOGGER.debug(
+                "created DNS probe socket: family=%s, kernel_timestamps=%s",
+                family,
+                probe_socket.kernel_timestamps,
+            )
+            probe_socket.set_receive_buffer(self._probes * RECV_BUFFER_PER_PROBE)
+            self._sockets[family] = probe_socket
+        return probe_socket
+
+    async def async_query(
+        self,
+        family: int,
+        server: str,
+        query: bytes,
+        qtype: int,
+        timeout: float,
+        instrumentation: Instrumentation | None = None,
+    ) -> tuple[list[str], float]:
+        """
+        Send a prebuilt DNS query to a server and return the answers and rtt.
+
+        If instrumentation is provided, the send, wait and parse stages are
+        timed.
+        """
+        probe_socket = self._get_socket(family)
+        txid = secrets.randbits(16)
+        while (txid, server) in self._pending:
+            txid = secrets.randbits(16)
+        key = (txid, server)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            start_ns = time.perf_counter_ns()
+            tx_time = probe_socket.send(_TXID.pack(txid) + query, (server, self.port))
+            if instrumentation:
+                instrumentation.record(STAGE_SEND, start_ns)
+                start_ns = time.perf_counter_ns()
+            async with asyncio.timeout(timeout):
+                data, rx_time = await future
+            if instrumentation:
+                instrumentation.record(STAGE_WAIT, start_ns)
+        except TimeoutError as exc:
+            raise DNSProbeTimeout(f"no response from {server}") from exc
+        except OSError as exc:
+            raise DNSProbeError(str(exc)) from exc
+        finally:
+            self._pending.pop(key, None)
+        start_ns = time.perf_counter_ns()
+        answers = parse_response(data, qtype)
+        if instrumentation:
+            instrumentation.record(STAGE_PARSE, start_ns)
+        return answers, probe_rtt(tx_time, rx_time)
+
+    def handle_response(
+        self, data: bytes, addr: tuple, rx_time: ProbeTimestamp
+    ) -> None:
+        """Match a received response to a pending query."""
+        if len(data) < _HEADER.size or addr[1] != self.port:
+            return
+        future = self._pending.get((_TXID.unpack_from(data)[0], addr[0]))
+        if future is not None and not future.done():
+            future.set_result((data, rx_time))
+
+    def close(self) -> None:
+        """Close all probe sockets and fail pending queries."""
+        for probe_socket in self._sockets.values():
+            probe_socket.close()
+        self._sockets.clear()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(DNSProbeError("probe socket closed"))
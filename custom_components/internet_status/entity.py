@@ -0,0 +1,84 @@
+"""Internet Status base entity."""
+
+from datetime import datetime, timedelta
+from typing import Any
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN, SCHEDULE_TOLERANCE
+from .coordinator import InternetStatusCoordinator
+
+
+class InternetStatusEntity(CoordinatorEntity):
+    """Base entity for Internet Status entities."""
+
+    coordinator: InternetStatusCoordinator
+
+    def __init__(self, coordinator: InternetStatusCoordinator, context: Any) -> None:
+        """Initialise the entity."""
+        super().__init__(coordinator, context=context)
+        self._last_written_state: tuple | None = None
+        self._last_written_time = 0.0
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the device info."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self.coordinator.entry.entry_id)},
+            name=self.coordinator.entry.title,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Start the heartbeat when the entity is added."""
+        await super().async_added_to_hass()
+        if heartbeat_interval := self.coordinator.heartbeat_interval:
+            ## Unchanged entities may not receive any coordinator updates
+            self.async_on_remove(
+                async_track_time_interval(
+                    self.hass,
+                    self._async_heartbeat,
+                    timedelta(seconds=heartbeat_interval),
+                )
+            )
+
+    @callback
+    def _async_heartbeat(self, _now: datetime) -> None:
+        """Rewrite the entity state if it has not been written for a heartbeat."""
+        if self._last_written_state is not None and (
+            time.monotonic()
+            >= self._last_written_time
+            + self.coordinator.heartbeat_interval
+            - SCHEDULE_TOLERANCE
+        ):
+            self._last_written_time = time.monotonic()
+            self.async_write_ha_state()
+
+    @callback
+    def async_write_ha_state_if_changed(self) -> None:
+        """
+        Write the entity state only if it has changed since the last write.
+
+        The state is also written if the heartbeat interval configured for the
+        integration has elapsed since the last write, and by the heartbeat
+        timer if no update is received.
+        """
+        state = (
+            self.available,
+            self.state,
+            self.icon,
+            self.extra_state_attributes,
+        )
+        current_time = time.monotonic()
+        heartbeat_interval = self.coordinator.heartbeat_interval
+        if state == self._last_written_state and (
+            not heartbeat_interval
+            or current_time < self._last_written_time + heartbeat_interval
+        ):
+            return
+        self._last_written_state = state
+        self._last_written_time = current_time
+        self.async_write_ha_state()
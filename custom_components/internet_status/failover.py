@@ -0,0 +1,113 @@
+"""Incremental link failover detection for Internet Status."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+import logging
+
+if TYPE_CHECKING:
+    from .coordinator import InternetLink
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _index_add(index: dict[str, set[int]], ip: str | None, position: int) -> None:
+    """Add a link position to an IP address index."""
+    if ip:
+        index.setdefault(ip, set()).add(position)
+
+
+def _index_remove(index: dict[str, set[int]], ip: str | None, position: int) -> None:
+    """Remove a link position from an IP address index."""
+    if ip and (positions := index.get(ip)):
+        positions.discard(position)
+        if not positions:
+            del index[ip]
+
+
+class FailoverIndex:
+    """
+    Index of main link IP addresses for incremental failover detection.
+
+    A main link has failed over if its current IP address is the configured
+    IP address (or current IP address if none is configured) of a main link
+    that follows it in order. The positions of the links holding each IP
+    address are indexed, so that only the links whose IP addresses changed,
+    and the links whose current IP address is affected by the change, are
+    re-evaluated.
+    """
+
+    def __init__(self, links: list[InternetLink]) -> None:
+        self.links = links
+        self._positions = {link: position for position, link in enumerate(links)}
+        self._link_ips: dict[InternetLink, tuple[str | None, str | None]] = {}
+        self._key_index: dict[str, set[int]] = {}
+        self._current_index: dict[str, set[int]] = {}
+        self.failed_over: set[InternetLink] = set()
+        self.secondaries_down: set[InternetLink] = set()
+
+    def rebuild(self) -> set[InternetLink]:
+        """Re-index and re-evaluate all main links."""
+        self._link_ips.clear()
+        self._key_index.clear()
+        self._current_index.clear()
+        return self.update(self.links)
+
+    def update(self, links: Iterable[InternetLink]) -> set[InternetLink]:
+        """
+        Update the index for links that have been probed.
+
+        Returns the links whose link_up or link_failover status changed.
+        """
+        evaluate: set[InternetLink] = set()
+        affected_ips: set[str] = set()
+        for link in links:
+            if (position := self._positions.get(link)) is None:
+                continue  ## monitor-only link
+            evaluate.add(link)
+            key_ip, current_ip = self._link_ips.get(link, (None, None))
+            new_key_ip = link.configured_ip or link.current_ip
+            if new_key_ip != key_ip:
+                _index_remove(self._key_index, key_ip, position)
+                _index_add(self._key_index, new_key_ip, position)
+                affected_ips.update(ip for ip in (key_ip, new_key_ip) if ip)
+            if link.current_ip != current_ip:
+                _index_remove(self._current_index, current_ip, position)
+                _index_add(self._current_index, link.current_ip, position)
+            self._link_ips[link] = (new_key_ip, link.current_ip)
+
+        for ip in affected_ips:
+            for position in self._current_index.get(ip, ()):
+                evaluate.add(self.links[position])
+
+        return {link for link in evaluate if self._evaluate(link)}
+
+    def _evaluate(self, link: InternetLink) -> bool:
+        """Update the failover status of a link and return whether it changed."""
+        status = (link.link_up, link.link_failover)
+        position = self._positions[link]
+        link_failover = False
+        failover_to = None
+        if link.current_ip and (positions := self._key_index.get(link.current_ip)):
+            last = max(positions)
+            if last > position:
+                link_failover = True
+                failover_to = self.links[last]
+        if link_failover:
+            self.failed_over.add(link)
+            link.link_up = None  ## for links with no configured IP set
+        else:
+            self.failed_over.discard(link)
+        if link.link_failover != link_failover:
+            if link_failover:
+                _LOGGER.info("%s: failed over to link %s", link.name, failover_to.name)
+            elif link.link_failover is not None:
+                _LOGGER.info("%s: link failover cleared", link.name)
+            link.link_failover = link_failover
+        if position:
+            if link.link_up:
+                self.secondaries_down.discard(link)
+            else:
+                self.secondaries_down.add(link)
+        return status != (link.link_up, link.link_failover)
@@ -0,0 +1,92 @@
+"""Phi-accrual failure detector for Internet Status links."""
+
+from __future__ import annotations
+
+from collections import deque
+import math
+
+## Largest suspicion level reported, reached when the probability of a late
+## probe underflows
+PHI_MAX = 100.0
+## Standard deviation floor as a ratio of the mean probe interval
+MIN_STD_RATIO = 0.1
+
+
+class _Window:
+    """Rolling mean and variance over the most recent samples."""
+
+    def __init__(self, size: int) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def add(self, value: float) -> None:
+        """Add a sample, evicting the oldest if the window is full."""
+        if len(self._samples) == self._samples.maxlen:
+            oldest = self._samples[0]
+            self._sum -= oldest
+            self._sum_sq -= oldest * oldest
+        self._samples.append(value)
+        self._sum += value
+        self._sum_sq += value * value
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def mean(self) -> float:
+        """Return the mean of the window."""
+        return self._sum / len(self._samples) if self._samples else 0.0
+
+    @property
+    def variance(self) -> float:
+        """Return the population variance of the window."""
+        if not self._samples:
+            return 0.0
+        mean = self.mean
+        return max(self._sum_sq / len(self._samples) - mean * mean, 0.0)
+
+
+class PhiAccrualDetector:
+    """
+    Phi-accrual failure detector fed by successful link probes.
+
+    Each successful probe is treated as a heartbeat. The intervals between
+    heartbeats, and the variance of the probe rtts, model when the next
+    heartbeat is expected. The suspicion level phi is -log10 of the
+    probability that a heartbeat arrives later than the time elapsed since
+    the last one, so phi=1 is a 10% chance of a false suspicion, phi=2 is 1%,
+    and so on.
+    """
+
+    def __init__(self, first_interval: float, size: int) -> None:
+        self._intervals = _Window(size)
+        self._rtts = _Window(size)
+        ## Seed the window with the expected interval, with std = interval / 4
+        std = first_interval / 4
+        self._intervals.add(first_interval - std)
+        self._intervals.add(first_interval + std)
+        self.last_heartbeat: float | None = None
+
+    def heartbeat(self, timestamp: float, rtt: float | None = None) -> None:
+        """Record a successful probe at a monotonic timestamp, with rtt in ms."""
+        if self.last_heartbeat is not None:
+            self._intervals.add(timestamp - self.last_heartbeat)
+        if rtt is not None:
+            self._rtts.add(rtt / 1000)
+        self.last_heartbeat = timestamp
+
+    def phi(self, timestamp: float) -> float:
+        """Return the suspicion level at a monotonic timestamp."""
+        if self.last_heartbeat is None:
+            return 0.0
+        mean = self._intervals.mean
+        std = max(
+            math.sqrt(self._intervals.variance + self._rtts.variance),
+            mean * MIN_STD_RATIO,
+        )
+        elapsed = timestamp - self.last_heartbeat
+        p_later = 0.5 * math.erfc((elapsed - mean) / (std * math.sqrt(2)))
+        if p_later <= 0.0:
+            return PHI_MAX
+        return min(-math.log10(p_later), PHI_MAX)
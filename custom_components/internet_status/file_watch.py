@@ -0,0 +1,98 @@
+"""inotify file watcher for Internet Status file probes."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import asyncio
+import ctypes
+import errno
+import logging
+import os
+import struct
+import sys
+
+_LOGGER = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_EVENT = struct.Struct("iIII")  ## wd, mask, cookie, len
+_READ_SIZE = 4096
+
+_libc: ctypes.CDLL | None = None
+
+
+def _get_libc() -> ctypes.CDLL | None:
+    """Return libc if it provides inotify."""
+    global _libc  # pylint: disable=global-statement
+    if _libc is None and sys.platform.startswith("linux"):
+        ## Symbols already loaded into the process, so no library search is needed
+        libc = ctypes.CDLL(None, use_errno=True)
+        if hasattr(libc, "inotify_init1"):
+            _libc = libc
+    return _libc
+
+
+class FileWatchError(Exception):
+    """File cannot be watched."""
+
+
+class FileWatcher:
+    """
+    Watch a file for completed writes and removal using inotify.
+
+    The parent directory is watched so that files replaced by renaming a
+    temporary file over them, or deleted, are also detected.
+    """
+
+    def __init__(self, path: str, callback: Callable[[], None]) -> None:
+        if (libc := _get_libc()) is None:
+            raise FileWatchError("inotify is not supported on this platform")
+        self._callback = callback
+        directory, filename = os.path.split(os.path.abspath(path))
+        self._filename = os.fsencode(filename)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise FileWatchError(os.strerror(ctypes.get_errno()))
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), IN_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise FileWatchError(f"{directory}: {os.strerror(err)}")
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._fd, self._read_ready)
+
+    def _read_ready(self) -> None:
+        """Read inotify events and invoke the callback for events on the file."""
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError as exc:
+                if exc.errno != errno.EINTR:
+                    _LOGGER.warning("file watch read failed: %s", exc)
+                    break
+                continue
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                _, mask, _, name_len = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset : offset + name_len].rstrip(b"\0")
+                offset += name_len
+                if name == self._filename and mask & IN_MASK:
+                    changed = True
+        if changed:
+            self._callback()
+
+    def close(self) -> None:
+        """Stop watching the file."""
+        if self._fd >= 0:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = -1
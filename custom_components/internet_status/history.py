@@ -0,0 +1,190 @@
+"""Memory-mapped per-probe RTT history for Internet Status."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import datetime, timezone
+import bisect
+import csv
+import mmap
+import os
+import struct
+import time
+import zlib
+
+MAGIC = b"ISRH"
+VERSION = 1
+
+## magic, version, record size, capacity, next record, record count
+_HEADER = struct.Struct("<4sHHIII12x")
+## unix time, link id, rtt (ms), ip hash, flags
+_RECORD = struct.Struct("<dIfIB3x")
+_TIME = struct.Struct("<d")
+_POSITION = struct.Struct("<II")
+_POSITION_OFFSET = 12
+
+FLAG_SUCCESS = 0x01
+
+
+def name_hash(name: str | None) -> int:
+    """Return the 32-bit hash used to identify a link name or IP address."""
+    return zlib.crc32(name.encode()) if name else 0
+
+
+class RttHistory:
+    """
+    Ring of fixed-size probe records in a memory-mapped file.
+
+    Each probe is recorded with its time, link id, rtt, success flag and a
+    hash of the IP address returned. Links are identified by a hash of the
+    link name, so records remain attributable after links are added, removed
+    or reordered. Recording a probe packs the record straight into the
+    mapping, and the kernel writes dirty pages back in the background, so the
+    event loop does not make any system calls. The oldest records are
+    overwritten once the ring is full.
+    """
+
+    def __init__(self, path: str, capacity: int) -> None:
+        """Open or create the history file. (blocking)"""
+        self.path = path
+        self.capacity = capacity
+        size = _HEADER.size + capacity * _RECORD.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            existing = os.fstat(fd).st_size
+            if existing != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        magic, version, record_size, file_capacity, self._next, self._count = (
+            _HEADER.unpack_from(self._mmap)
+        )
+        if (magic, version, record_size, file_capacity) != (
+            MAGIC,
+            VERSION,
+            _RECORD.size,
+            capacity,
+        ) or not (self._next < capacity and self._count <= capacity):
+            ## New file, or a file written with a different format or size
+            self._next = self._count = 0
+            _HEADER.pack_into(
+                self._mmap, 0, MAGIC, VERSION, _RECORD.size, capacity, 0, 0
+            )
+
+    def record(self, link_id: int, rtt: float | None, ip: str | None) -> None:
+        """Record the outcome of a probe. A probe with no rtt failed."""
+        _RECORD.pack_into(
+            self._mmap,
+            _HEADER.size + self._next * _RECORD.size,
+            time.time(),
+            link_id,
+            rtt if rtt is not None else float("nan"),
+            name_hash(ip),
+            FLAG_SUCCESS if rtt is not None else 0,
+        )
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        _POSITION.pack_into(self._mmap, _POSITION_OFFSET, self._next, self._count)
+
+    def position(self) -> tuple[int, int]:
+        """Return the next record and record count, to bound a later read."""
+        return self._next, self._count
+
+    def _offset(self, first: int, index: int) -> int:
+        """Return the file offset of a record counted from the first record."""
+        return _HEADER.size + (first + index) % self.capacity * _RECORD.size
+
+    def read(
+        self,
+        position: tuple[int, int],
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[bytes]:
+        """
+        Return the records before position between start and end. (blocking)
+
+        start and end are unix times. Records are written in time order, so
+        the range is found by binary search, and only that range is copied from the mapping, in at most
+        two chunks, oldest first.
+        """
+        next_record, count = position
+        first = (next_record - count) % self.capacity
+
+        def timestamp(index: int) -> float:
+            """Return the time of a record counted from the first record."""
+            return _TIME.unpack_from(self._mmap, self._offset(first, index))[0]
+
+        low = (
+            0
+            if start is None
+            else bisect.bisect_left(range(count), start, key=timestamp)
+        )
+        high = (
+            count
+            if end is None
+            else bisect.bisect_right(range(count), end, key=timestamp)
+        )
+        chunks = []
+        while low < high:
+            offset = self._offset(first, low)
+            records = min(high - low, self.capacity - (first + low) % self.capacity)
+            chunks.append(self._mmap[offset : offset + records * _RECORD.size])
+            low += records
+        return chunks
+
+    def close(self) -> None:
+        """Flush and close the history file. (blocking)"""
+        self._mmap.flush()
+        self._mmap.close()
+
+
+def iter_records(
+    records: bytes, start: float | None = None, end: float | None = None
+) -> Iterator[tuple[float, int, float | None, int, bool]]:
+    """Iterate over packed records between unix times start and end."""
+    for timestamp, link_id, rtt, ip_hash, flags in _RECORD.iter_unpack(records):
+        if (start is not None and timestamp < start) or (
+            end is not None and timestamp > end
+        ):
+            continue
+        success = bool(flags & FLAG_SUCCESS)
+        yield timestamp, link_id, round(rtt, 3) if success else None, ip_hash, success
+
+
+def write_history_csv(
+    path: str,
+    history: RttHistory,
+    position: tuple[int, int],
+    link_names: dict[int, str],
+    start: float | None = None,
+    end: float | None = None,
+) -> int:
+    """
+    Write the records before position to a CSV file. (blocking)
+
+    Records recorded after position was taken are not written. If the ring
+    wraps during the export, the oldest records may be overwritten by newer
+    ones, which are dropped if they are outside the time range.
+    """
+    count = 0
+    with open(path, "w", encoding="utf8", newline="") as fileh:
+        writer = csv.writer(fileh)
+        writer.writerow(["time", "link", "rtt", "success", "ip_hash"])
+        for records in history.read(position, start, end):
+            for timestamp, link_id, rtt, ip_hash, success in iter_records(
+                records, start, end
+            ):
+                writer.writerow(
+                    [
+                        datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                        link_names.get(link_id, f"{link_id:08x}"),
+                        rtt,
+                        int(success),
+                        f"{ip_hash:08x}" if ip_hash else "",
+                    ]
+                )
+                count += 1
+    return count
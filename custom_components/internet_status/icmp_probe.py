@@ -0,0 +1,276 @@
+"""Shared ICMP echo probe engine for Internet Status."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import secrets
+import socket
+import struct
+
+from .probe_socket import ProbeSocket, ProbeTimestamp, probe_rtt
+
+_LOGGER = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+PAYLOAD_SIZE = 56
+## Sends within a round of echo requests are spaced by at most this
+MAX_SEND_GAP = 0.01
+
+_ICMP_HEADER = struct.Struct("!BBHHH")  ## type, code, checksum, id, sequence
+
+
+class ICMPProbeError(Exception):
+    """ICMP probe failed."""
+
+
+@dataclass
+class PingResult:
+    """Result of a train of echo requests to one address."""
+
+    address: str
+    packets_sent: int = 0
+    rtts: list[float] = field(default_factory=list)
+
+    @property
+    def packets_received(self) -> int:
+        """Return the number of echo replies received."""
+        return len(self.rtts)
+
+    @property
+    def is_alive(self) -> bool:
+        """Return whether any echo reply was received."""
+        return bool(self.rtts)
+
+
+@dataclass
+class _PingTrain:
+    """Pending train of echo requests to one address."""
+
+    family: int
+    address: str
+    count: int
+    timeout: float
+    result: PingResult
+    sent: asyncio.Future[None]
+    futures: list[asyncio.Future[float | None]] = field(default_factory=list)
+
+
+def _checksum(data: bytes) -> int:
+    """Return the internet checksum of data."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class ICMPProbeEngine:
+    """
+    ICMP echo probe engine shared by all ping links of an entry.
+
+    Echo requests from all links are sent over one ICMP socket per address
+    family, and replies are matched to requests by address, identifier and
+    sequence number. Ping trains requested in the same event loop iteration
+    are batched: each round sends one echo request to every target, spaced
+    evenly within the round, so the trains of different links are interleaved
+    rather than sent as simultaneous bursts.
+    """
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self._sockets: dict[int, tuple[ProbeSocket, bool]] = {}
+        self._ident = secrets.randbits(16)
+        self._sequence = 0
+        self._pending: dict[
+            tuple[str, int], tuple[asyncio.Future[float | None], ProbeTimestamp]
+        ] = {}
+        self._batch: list[_PingTrain] = []
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    def _get_socket(self, family: int) -> tuple[ProbeSocket, bool]:
+        """Return the ICMP socket for an address family, and whether it is raw."""
+        if (entry := self._sockets.get(family)) is None:
+            proto = (
+                socket.IPPROTO_ICMP
+                if family == socket.AF_INET
+                else socket.IPPROTO_ICMPV6
+            )
+            try:
+                entry = (
+                    ProbeSocket(
+                        family,
+                        socket.SOCK_RAW,
+                        proto,
+                        lambda data, addr, rx_time: self.handle_reply(
+                            family, True, data, addr, rx_time
+                        ),
+                    ),
+                    True,
+                )
+            except PermissionError:
+                ## Fall back to unprivileged ICMP datagram socket
+                entry = (
+                    ProbeSocket(
+                        family,
+                        socket.SOCK_DGRAM,
+                        proto,
+                        lambda data, addr, rx_time: self.handle_reply(
+                            family, False, data, addr, rx_time
+                        ),
+                    ),
+                    False,
+                )
+            _LOGGER.debug(
+                "created ICMP probe socket: family=%s, raw=%s, kernel_timestamps=%s",
+                family,
+                entry[1],
+                entry[0].kernel_timestamps,
+            )
+            self._sockets[family] = entry
+        return entry
+
+    def _next_sequence(self, address: str) -> int:
+        """Return the next free sequence number for an address."""
+        while True:
+            self._sequence = (self._sequence + 1) & 0xFFFF
+            if (address, self._sequence) not in self._pending:
+                return self._sequence
+
+    async def async_ping(
+        self, family: int, address: str, count: int, timeout: float
+    ) -> PingResult:
+        """Send a train of echo requests to an IP address and return the result."""
+        if self._closed:
+            raise ICMPProbeError("probe engine closed")
+        try:
+            self._get_socket(family)
+        except OSError as exc:
+            raise ICMPProbeError(f"cannot open ICMP socket: {exc}") from exc
+        loop = asyncio.get_running_loop()
+        train = _PingTrain(
+            family, address, count, timeout, PingResult(address), loop.create_future()
+        )
+        if not self._batch:
+            task = loop.create_task(self._async_send_batch())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._batch.append(train)
+        try:
+            await train.sent
+            rtts = await asyncio.gather(*train.futures)
+        finally:
+            for future in train.futures:
+                future.cancel()
+        train.result.rtts = [rtt for rtt in rtts if rtt is not None]
+        return train.result
+
+    async def _async_send_batch(self) -> None:
+        """Send the echo requests of all ping trains batched in this iteration."""
+        await asyncio.sleep(0)  ## let the batch fill
+        batch, self._batch = self._batch, []
+        try:
+            rounds = max(train.count for train in batch)
+            for round_num in range(rounds):
+                trains = [
+                    train
+                    for train in batch
+                    if round_num < train.count and not train.sent.done()
+                ]
+                if not trains:
+                    break
+                gap = min(self.interval / len(trains), MAX_SEND_GAP)
+                for index, train in enumerate(trains):
+                    if index:
+                        await asyncio.sleep(gap)
+                    train.futures.append(self._send_echo(train))
+                    if len(train.futures) == train.count:
+                        train.sent.set_result(None)
+                if round_num + 1 < rounds:
+                    await asyncio.sleep(self.interval - gap * (len(trains) - 1))
+        finally:
+            for train in batch:
+                if not train.sent.done():
+                    train.sent.set_exception(ICMPProbeError("probe engine closed"))
+
+    def _send_echo(self, train: _PingTrain) -> asyncio.Future[float | None]:
+        """Send one echo request and return a future for its rtt."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[float | None] = loop.create_future()
+        probe_socket, _ = self._sockets[train.family]
+        sequence = self._next_sequence(train.address)
+        if train.family == socket.AF_INET:
+            icmp_type = ICMP_ECHO_REQUEST
+        else:
+            icmp_type = ICMPV6_ECHO_REQUEST
+        packet = bytearray(
+            _ICMP_HEADER.pack(icmp_type, 0, 0, self._ident, sequence)
+            + bytes(PAYLOAD_SIZE)
+        )
+        if train.family == socket.AF_INET:
+            ## The kernel computes the ICMPv6 checksum
+            struct.pack_into("!H", packet, 2, _checksum(packet))
+        key = (train.address, sequence)
+        train.result.packets_sent += 1
+        try:
+            tx_time = probe_socket.send(packet, (train.address, 0))
+        except OSError as exc:
+            _LOGGER.debug("echo request to %s failed: %s", train.address, exc)
+            future.set_result(None)
+            return future
+        self._pending[key] = (future, tx_time)
+        timer = loop.call_later(train.timeout, self._expire, key)
+
+        def _done(_future: asyncio.Future[float | None]) -> None:
+            timer.cancel()
+            self._pending.pop(key, None)
+
+        future.add_done_callback(_done)
+        return future
+
+    def _expire(self, key: tuple[str, int]) -> None:
+        """Record an echo request with no reply as lost."""
+        if entry := self._pending.pop(key, None):
+            if not entry[0].done():
+                entry[0].set_result(None)
+
+    def handle_reply(
+        self, family: int, raw: bool, data: bytes, addr: tuple, rx_time: ProbeTimestamp
+    ) -> None:
+        """Match a received echo reply to a pending echo request."""
+        if family == socket.AF_INET:
+            if raw and data:
+                data = data[(data[0] & 0x0F) * 4 :]  ## strip IPv4 header
+            reply_type = ICMP_ECHO_REPLY
+        else:
+            reply_type = ICMPV6_ECHO_REPLY
+        if len(data) < _ICMP_HEADER.size:
+            return
+        icmp_type, _, _, ident, sequence = _ICMP_HEADER.unpack_from(data)
+        ## Datagram sockets only receive their own replies, with the
+        ## identifier rewritten by the kernel
+        if icmp_type != reply_type or (raw and ident != self._ident):
+            return
+        entry = self._pending.get((addr[0], sequence))
+        if entry is not None and not entry[0].done():
+            entry[0].set_result(probe_rtt(entry[1], rx_time))
+
+    def close(self) -> None:
+        """Close all ICMP sockets and fail pending echo requests."""
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        for probe_socket, _ in self._sockets.values():
+            probe_socket.close()
+        self._sockets.clear()
+        for future, _ in list(self._pending.values()):
+            if not future.done():
+                future.set_result(None)
+        self._pending.clear()
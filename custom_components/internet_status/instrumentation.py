@@ -0,0 +1,153 @@
+"""Hot path instrumentation and profiling for Internet Status."""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import time
+
+STAGE_SEND = "send"
+STAGE_WAIT = "wait"
+STAGE_PARSE = "parse"
+STAGE_REVERSE_LOOKUP = "reverse_lookup"
+STAGE_STATUS = "status"
+STAGE_DISPATCH = "dispatch"
+STAGE_CYCLE = "cycle"
+PROBE_PREFIX = "probe."
+
+## Histogram buckets are powers of two of microseconds, up to about 67s
+_BUCKETS = 27
+
+## cProfile profiles the whole process, so only one entry can profile at once
+_profiling: Instrumentation | None = None
+
+
+class Histogram:
+    """
+    Histogram of durations with logarithmic buckets.
+
+    Recording a duration is a bit length calculation and a list increment,
+    so it is cheap enough to be left enabled on the hot path. Percentiles are
+    estimated as the upper bound of the bucket containing the rank.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns: int) -> None:
+        """Record a duration in nanoseconds."""
+        ## ns >> 10 approximates us
+        bucket = min(max(duration_ns >> 10, 0).bit_length(), _BUCKETS - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, percent: float) -> float | None:
+        """Return the estimated percentile in milliseconds."""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min((1 << bucket) * 1.024e-3, self.max_ns / 1e6), 3)
+        return round(self.max_ns / 1e6, 3)
+
+    def summary(self) -> dict[str, float | int | None]:
+        """Return summary statistics in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": (
+                round(self.total_ns / self.count / 1e6, 3) if self.count else None
+            ),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ns / 1e6, 3),
+        }
+
+
+class Instrumentation:
+    """Duration histograms for the probe and update stages of an entry."""
+
+    def __init__(self) -> None:
+        self.histograms: dict[str, Histogram] = {}
+        self._profiler: cProfile.Profile | None = None
+        self._profile_cycles = 0
+
+    def record(self, name: str, start_ns: int) -> None:
+        """Record the duration of a stage that started at start_ns."""
+        duration_ns = time.perf_counter_ns() - start_ns
+        if (histogram := self.histograms.get(name)) is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.record(duration_ns)
+
+    def summary(self) -> dict[str, dict[str, float | int | None]]:
+        """Return summary statistics for all stages."""
+        return {
+            name: histogram.summary()
+            for name, histogram in sorted(self.histograms.items())
+        }
+
+    def start_profile(self, cycles: int) -> None:
+        """
+        Start profiling the event loop thread for a number of update cycles.
+
+        Raises ValueError if another profiler is active in the process.
+        """
+        global _profiling  # pylint: disable=global-statement
+        if _profiling is not None:
+            raise ValueError("another profile is being collected")
+        profiler = cProfile.Profile()
+        profiler.enable()
+        self._profiler = profiler
+        self._profile_cycles = cycles
+        _profiling = self
+
+    def stop_profile(self) -> cProfile.Profile | None:
+        """Stop profiling and return the profiler, if a profile was being collected."""
+        global _profiling  # pylint: disable=global-statement
+        profiler, self._profiler = self._profiler, None
+        if profiler is not None:
+            profiler.disable()
+            if _profiling is self:
+                _profiling = None
+        return profiler
+
+    def cycle_done(self) -> cProfile.Profile | None:
+        """Count an update cycle, and return the profiler when it is complete."""
+        if self._profiler is None:
+            return None
+        self._profile_cycles -= 1
+        if self._profile_cycles > 0:
+            return None
+        return self.stop_profile()
+
+
+def write_profile_report(
+    path: str,
+    profiler: cProfile.Profile,
+    summary: dict[str, dict[str, float | int | None]],
+) -> None:
+    """Write the profile and stage timings to a file. (blocking)"""
+    stream = io.StringIO()
+    stream.write("Stage timings (ms):\n")
+    for name, stats in summary.items():
+        stream.write(
+            f"  {name}: "
+            + ", ".join(f"{key}={value}" for key, value in stats.items())
+            + "\n"
+        )
+    stream.write("\n")
+    pstats.Stats(profiler, stream=stream).sort_stats(
+        pstats.SortKey.CUMULATIVE
+    ).print_stats(50)
+    with open(path, "w", encoding="utf8") as fileh:
+        fileh.write(stream.getvalue())
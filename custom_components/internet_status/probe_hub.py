@@ -0,0 +1,69 @@
+"""Probe sharing between the links of all Internet Status entries."""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+import asyncio
+import time
+
+
+@dataclass(slots=True)
+class ProbeSnapshot:
+    """Raw result of a link probe, before it is evaluated by the link."""
+
+    current_ip: str | None
+    rtt: float | None
+    rtt_array: list[float] = field(default_factory=list)
+    losses: int = 0
+    time: float = field(default_factory=time.monotonic)
+
+
+class ProbeHub:
+    """
+    Probes shared by the links of all config entries.
+
+    Links that probe the same target with the same parameters share a probe
+    key. A link that is due joins a probe of its key that is in progress, or
+    reuses the latest result of its key if it is recent enough, instead of
+    probing itself. Each link bounds the age of the results it reuses, so
+    the target is probed at the rate of the link with the shortest interval.
+    Links still evaluate the result themselves, as configured IP addresses
+    and reverse hostnames differ between links.
+    """
+
+    def __init__(self) -> None:
+        self._results: dict[Hashable, ProbeSnapshot] = {}
+        self._inflight: dict[Hashable, asyncio.Future[ProbeSnapshot | None]] = {}
+
+    async def async_probe(
+        self,
+        key: Hashable,
+        max_age: float,
+        probe: Callable[[], Awaitable[ProbeSnapshot]],
+    ) -> tuple[ProbeSnapshot, bool]:
+        """
+        Return a probe result for a key, and whether it was shared.
+
+        If no result for the key is younger than max_age seconds and no probe
+        is in progress, probe is called to probe the target.
+        """
+        if (snapshot := self._results.get(key)) is not None and (
+            time.monotonic() - snapshot.time <= max_age
+        ):
+            return snapshot, True
+        while (future := self._inflight.get(key)) is not None:
+            if (snapshot := await asyncio.shield(future)) is not None:
+                return snapshot, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        snapshot = None
+        try:
+            snapshot = await probe()
+            self._results[key] = snapshot
+        finally:
+            ## A failed probe wakes waiters with no result, to probe themselves
+            del self._inflight[key]
+            future.set_result(snapshot)
+        return snapshot, False
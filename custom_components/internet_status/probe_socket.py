@@ -0,0 +1,144 @@
+"""Timestamped datagram sockets for Internet Status probes."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import asyncio
+import logging
+import socket
+import struct
+import sys
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+RECV_BUFSIZE = 4096
+## Not exported by the socket module, value is SO_TIMESTAMPNS_OLD on Linux
+SO_TIMESTAMPNS = getattr(
+    socket, "SO_TIMESTAMPNS", 35 if sys.platform.startswith("linux") else None
+)
+## Linux only, exceeds net.core.rmem_max if the process has CAP_NET_ADMIN
+SO_RCVBUFFORCE = getattr(
+    socket, "SO_RCVBUFFORCE", 33 if sys.platform.startswith("linux") else None
+)
+_TIMESPEC = struct.Struct("@ll")
+_ANC_BUFSIZE = socket.CMSG_SPACE(_TIMESPEC.size) if hasattr(socket, "CMSG_SPACE") else 0
+
+## Kernel receive timestamps may trail the monotonic send timestamp by no
+## more than this before they are considered unreliable (eg. clock step).
+_MAX_CLOCK_SKEW_NS = 1_000_000
+
+ProbeTimestamp = tuple[int, int | None]  ## (monotonic ns, kernel realtime ns)
+
+
+def ip_address_family(address: str) -> int | None:
+    """Return the address family of an IP address, or None if not an IP address."""
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, address)
+        except (OSError, ValueError):
+            continue
+        return family
+    return None
+
+
+def probe_rtt(tx_time: ProbeTimestamp, rx_time: ProbeTimestamp) -> float:
+    """Return the rtt in milliseconds between send and receive timestamps."""
+    rtt_ns = rx_time[0] - tx_time[0]
+    if tx_time[1] is not None and rx_time[1] is not None:
+        ## Prefer the kernel receive timestamp, which excludes event loop delay
+        kernel_rtt_ns = rx_time[1] - tx_time[1]
+        if 0 <= kernel_rtt_ns <= rtt_ns + _MAX_CLOCK_SKEW_NS:
+            rtt_ns = kernel_rtt_ns
+    return round(rtt_ns / 1_000_000, 3)
+
+
+class ProbeSocket:
+    """
+    Non-blocking datagram socket with receive timestamps.
+
+    Where supported, SO_TIMESTAMPNS is enabled so that each datagram carries
+    the time it was received by the kernel. Otherwise the monotonic clock is
+    read as soon as the datagram is read from the socket.
+    """
+
+    def __init__(
+        self,
+        family: int,
+        sock_type: int,
+        proto: int,
+        callback: Callable[[bytes, tuple, ProbeTimestamp], None],
+    ) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._callback = callback
+        self.sock = socket.socket(family, sock_type, proto)
+        self.sock.setblocking(False)
+        self.kernel_timestamps = False
+        if _ANC_BUFSIZE and SO_TIMESTAMPNS is not None:
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+                self.kernel_timestamps = True
+            except OSError as exc:
+                _LOGGER.debug("kernel receive timestamps not available: %s", exc)
+        self._loop.add_reader(self.sock.fileno(), self._read_ready)
+
+    def set_receive_buffer(self, size: int) -> None:
+        """
+        Grow the receive buffer of the socket to at least size bytes.
+
+        SO_RCVBUFFORCE is used where permitted, otherwise the buffer is capped
+        by the kernel at net.core.rmem_max.
+        """
+        if size <= self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF):
+            return
+        for option in (SO_RCVBUFFORCE, socket.SO_RCVBUF):
+            if option is None:
+                continue
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, option, size)
+                break
+            except OSError:
+                continue
+        _LOGGER.debug(
+            "probe socket receive buffer: requested=%d, size=%d",
+            size,
+            self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+        )
+
+    def send(self, data: bytes, addr: tuple) -> ProbeTimestamp:
+        """Send a datagram and return the send timestamp."""
+        real_ns = time.time_ns() if self.kernel_timestamps else None
+        mono_ns = time.monotonic_ns()
+        self.sock.sendto(data, addr)
+        return mono_ns, real_ns
+
+    def _read_ready(self) -> None:
+        """Read all pending datagrams from the socket."""
+        while True:
+            kernel_ns = None
+            try:
+                if self.kernel_timestamps:
+                    data, ancdata, _, addr = self.sock.recvmsg(
+                        RECV_BUFSIZE, _ANC_BUFSIZE
+                    )
+                    for level, cmsg_type, cmsg_data in ancdata:
+                        if (
+                            level == socket.SOL_SOCKET
+                            and cmsg_type == SO_TIMESTAMPNS
+                            and len(cmsg_data) >= _TIMESPEC.size
+                        ):
+                            sec, nsec = _TIMESPEC.unpack_from(cmsg_data)
+                            kernel_ns = sec * 1_000_000_000 + nsec
+                else:
+                    data, addr = self.sock.recvfrom(RECV_BUFSIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                _LOGGER.debug("probe socket receive error: %s", exc)
+                return
+            self._callback(data, addr, (time.monotonic_ns(), kernel_ns))
+
+    def close(self) -> None:
+        """Close the socket."""
+        self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
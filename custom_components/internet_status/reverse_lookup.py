@@ -0,0 +1,109 @@
+"""Shared reverse DNS lookup cache for Internet Status."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+## Cache lifetime bounds for PTR answers, in seconds
+MIN_TTL = 5
+MAX_TTL = 86400
+## Cache lifetime for addresses with no PTR record, in seconds
+NEGATIVE_TTL = 300
+
+
+class ReverseLookupError(Exception):
+    """Reverse DNS lookup failed."""
+
+
+class ReverseLookupCache:
+    """
+    Reverse DNS lookup cache shared by all links.
+
+    PTR answers are cached for their TTL, and addresses without a PTR record
+    are cached for NEGATIVE_TTL. Concurrent lookups for the same address are
+    merged into a single query. Transient failures such as timeouts are not
+    cached.
+
+    dnspython is only needed for reverse lookups, so it is imported when the
+    cache is created rather than when the integration is loaded. The cache
+    must be created in the executor, as the import is blocking.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the cache. (blocking)"""
+        # pylint: disable=import-outside-toplevel
+        import dns.asyncresolver  # noqa: F401
+        import dns.rdata
+        import dns.rdataclass
+        import dns.rdatatype
+
+        ## Load the rdata classes used by reverse lookups now, rather than
+        ## on the first lookup in the event loop.
+        ## https://github.com/rthalley/dnspython/issues/1083
+        for rdtype in (dns.rdatatype.PTR, dns.rdatatype.CNAME):
+            dns.rdata.get_rdata_class(dns.rdataclass.IN, rdtype)
+
+        self._cache: dict[str, tuple[float, str | None, Exception | None]] = {}
+        self._inflight: dict[str, asyncio.Task[str]] = {}
+
+    async def async_resolve(self, address: str) -> str:
+        """Return the PTR name for an address, raising ReverseLookupError on failure."""
+        current_time = time.monotonic()
+        if (entry := self._cache.get(address)) is not None:
+            expiry, ptr_data, exc = entry
+            if expiry > current_time:
+                if exc is not None:
+                    raise exc
+                return ptr_data
+            del self._cache[address]
+
+        if (task := self._inflight.get(address)) is None:
+            task = asyncio.create_task(self._async_lookup(address))
+            self._inflight[address] = task
+            task.add_done_callback(lambda _: self._lookup_done(address))
+        return await asyncio.shield(task)
+
+    def _lookup_done(self, address: str) -> None:
+        """Remove a completed lookup from the in-flight lookups."""
+        task = self._inflight.pop(address)
+        if not task.cancelled():
+            task.exception()  ## retrieved here in case all waiters were cancelled
+
+    async def _async_lookup(self, address: str) -> str:
+        """Send the PTR query for an address and cache the result."""
+        # pylint: disable=import-outside-toplevel
+        import dns.asyncresolver  ## already imported by __init__
+        import dns.exception
+        import dns.resolver
+
+        _LOGGER.debug("reverse lookup for %s", address)
+        try:
+            answer = await dns.asyncresolver.resolve_address(address)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as exc:
+            error = ReverseLookupError(str(exc))
+            self._cache_result(address, NEGATIVE_TTL, None, error)
+            raise error from exc
+        except dns.exception.DNSException as exc:
+            raise ReverseLookupError(str(exc)) from exc
+        ptr_data = str(answer[0])
+        self._cache_result(address, answer.rrset.ttl, ptr_data, None)
+        return ptr_data
+
+    def _cache_result(
+        self,
+        address: str,
+        ttl: float,
+        ptr_data: str | None,
+        exc: ReverseLookupError | None,
+    ) -> None:
+        """Cache a lookup result and expire stale entries."""
+        current_time = time.monotonic()
+        for cached_address, (expiry, _, _) in list(self._cache.items()):
+            if expiry <= current_time:
+                del self._cache[cached_address]
+        ttl = min(max(ttl, MIN_TTL), MAX_TTL)
+        self._cache[address] = (current_time + ttl, ptr_data, exc)
@@ -1,6 +1,5 @@
 """Internet Status sensor platform."""
 
-from datetime import datetime, timedelta, UTC
 import logging
 
 from homeassistant.components.sensor import (
@@ -10,9 +9,7 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
 from .const import (
@@ -20,9 +17,13 @@ from .const import (
     DEF_LINK_RTT_SUFFIX,
     DEF_INTERNET_STATUS_ICON,
     DEF_LINK_RTT_ICON,
+    ATTR_PROBE_SERVERS,
     ATTR_RTT,
+    ATTR_STATISTIC_ID,
+    ATTR_WINDOW_MEAN,
 )
 from .coordinator import InternetStatusCoordinator, InternetLink
+from .entity import InternetStatusEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -41,10 +42,10 @@ async def async_setup_entry(
         if getattr(link, "rtt_update_interval", None) is not None:
             entities.append(LinkRttSensor(coordinator, link))
 
-    async_add_entities(entities, update_before_add=True)
+    async_add_entities(entities)
 
 
-class InternetStatusSensor(CoordinatorEntity, SensorEntity):
+class InternetStatusSensor(InternetStatusEntity, SensorEntity):
     """Sensor representing status of Internet access."""
 
     _attr_has_entity_name = True
@@ -65,22 +66,14 @@ class InternetStatusSensor(CoordinatorEntity, SensorEntity):
             self.coordinator.internet_status, DEF_INTERNET_STATUS_ICON[None]
         )
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.coordinator.entry.entry_id)},
-            name=self.coordinator.entry.title,
-        )
-
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         self._attr_native_value = self.coordinator.internet_status
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
 
-class LinkRttSensor(CoordinatorEntity, SensorEntity):
+class LinkRttSensor(InternetStatusEntity, SensorEntity):
     """Sensor that tracks rtt to probe server."""
 
     _attr_has_entity_name = True
@@ -89,6 +82,7 @@ class LinkRttSensor(CoordinatorEntity, SensorEntity):
     # _attr_device_class = SensorDeviceClass.DURATION
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = "ms"
+    _unrecorded_attributes = frozenset({ATTR_RTT, ATTR_PROBE_SERVERS})
 
     def __init__(
         self, coordinator: InternetStatusCoordinator, link: InternetLink
@@ -98,26 +92,39 @@ class LinkRttSensor(CoordinatorEntity, SensorEntity):
         self.link = link
         self._attr_name = f"{link.name} {DEF_LINK_RTT_SUFFIX}"
         self._attr_unique_id = f"{coordinator.entry.entry_id}:{slugify(link.name)}"
+        if link.rtt_statistics:
+            ## Long-term statistics are imported by the coordinator instead
+            self._attr_state_class = None
 
-        super().__init__(coordinator, context=link)
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.coordinator.entry.entry_id)},
-            name=self.coordinator.entry.title,
-        )
+        super().__init__(coordinator, context=link.rtt_context)
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        current_time = datetime.now(UTC)
-        if self.link.rtt_next_update <= current_time:
+        if self.link.rtt_statistics:
+            ## State is the mean of the last complete hour, so it is only
+            ## written when the hour changes
+            self.link.rtt_window.reset()
+            self.link.rtt_publish = False
+            self._attr_native_value = self.link.rtt_statistics.last_mean
+            self._attr_extra_state_attributes = {
+                ATTR_STATISTIC_ID: self.link.rtt_statistic_id
+            }
+            self.async_write_ha_state_if_changed()
+        elif self.link.rtt_publish:
             _LOGGER.debug("updating LinkRttSensor for link %s", self.link.name)
-            self._attr_native_value = self.link.rtt
-            self._attr_extra_state_attributes = {ATTR_RTT: self.link.rtt_array}
-            self.link.rtt_next_update = current_time + timedelta(
-                seconds=self.link.rtt_update_interval
-            )
+            window = self.link.rtt_window.summary()
+            self.link.rtt_window.reset()
+            self._attr_native_value = window[ATTR_WINDOW_MEAN]
+            self._attr_extra_state_attributes = {
+                ATTR_RTT: self.link.rtt_array,
+                **window,
+                **self.link.rtt_stats.summary(),
+            }
+            if len(probe_servers := getattr(self.link, "probe_servers", ())) > 1:
+                self._attr_extra_state_attributes[ATTR_PROBE_SERVERS] = {
+                    server.target: server.srtt and round(server.srtt, 3)
+                    for server in probe_servers
+                }
+            self.link.rtt_publish = False
             self.async_write_ha_state()
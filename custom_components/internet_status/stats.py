@@ -0,0 +1,350 @@
+"""Rolling probe statistics for Internet Status."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, insort
+import math
+import time
+
+from .const import (
+    ATTR_JITTER,
+    ATTR_LOSS,
+    ATTR_RTT_MAX,
+    ATTR_RTT_MEAN,
+    ATTR_RTT_MIN,
+    ATTR_RTT_P50,
+    ATTR_RTT_P95,
+    ATTR_RTT_P99,
+    ATTR_SAMPLES,
+    ATTR_WINDOW_MAX,
+    ATTR_WINDOW_MEAN,
+    ATTR_WINDOW_MIN,
+    ATTR_WINDOW_P95,
+    ATTR_WINDOW_SAMPLES,
+)
+
+
+class RttStats:
+    """
+    Rolling rtt statistics over the most recent probes of a link.
+
+    Successful rtt samples and probe outcomes are held in fixed-size ring
+    buffers, so recording a sample does not allocate. Sums, the sorted sample
+    order and the inter-sample jitter are maintained incrementally as samples
+    enter and leave the window.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._rtts = array("d", bytes(8 * size))
+        self._sorted = array("d")
+        self._count = 0
+        self._next = 0
+        self._sum = 0.0
+        self._jitter_sum = 0.0
+        self._lost = array("b", bytes(size))
+        self._probes = 0
+        self._probes_next = 0
+        self._loss_count = 0
+
+    def _record_probe(self, lost: bool) -> None:
+        """Record the outcome of a probe in the loss window."""
+        if self._probes == self.size:
+            self._loss_count -= self._lost[self._probes_next]
+        else:
+            self._probes += 1
+        self._lost[self._probes_next] = lost
+        self._loss_count += lost
+        self._probes_next = (self._probes_next + 1) % self.size
+
+    def add(self, rtt: float) -> None:
+        """Record a successful probe rtt."""
+        self._record_probe(False)
+        rtts = self._rtts
+        size = self.size
+        if self._count == size:
+            ## Evict the oldest sample
+            oldest = rtts[self._next]
+            self._sum -= oldest
+            self._jitter_sum -= abs(rtts[(self._next + 1) % size] - oldest)
+            del self._sorted[bisect_left(self._sorted, oldest)]
+        else:
+            self._count += 1
+        if self._count > 1:
+            self._jitter_sum += abs(rtt - rtts[(self._next - 1) % size])
+        rtts[self._next] = rtt
+        self._sum += rtt
+        insort(self._sorted, rtt)
+        self._next = (self._next + 1) % size
+        if self._next == 0:
+            self._resync()
+
+    def add_loss(self, count: int = 1) -> None:
+        """Record probes that received no response."""
+        for _ in range(count):
+            self._record_probe(True)
+
+    def to_dict(self) -> dict[str, list]:
+        """Return the rtt samples and probe outcomes in the window, oldest first."""
+        rtts = self._rtts
+        lost = self._lost
+        if self._count == self.size:
+            rtts = rtts[self._next :] + rtts[: self._next]
+        if self._probes == self.size:
+            lost = lost[self._probes_next :] + lost[: self._probes_next]
+        return {
+            "rtts": rtts[: self._count].tolist(),
+            "lost": lost[: self._probes].tolist(),
+        }
+
+    def restore(self, data: dict[str, list]) -> None:
+        """Restore the window from the output of to_dict()."""
+        for rtt in data.get("rtts", [])[-self.size :]:
+            self.add(rtt)
+        self._probes = self._probes_next = self._loss_count = 0
+        for lost in data.get("lost", [])[-self.size :]:
+            self._record_probe(bool(lost))
+
+    def _resync(self) -> None:
+        """Recompute running sums to discard accumulated rounding error."""
+        rtts = self._rtts
+        self._sum = math.fsum(rtts)
+        self._jitter_sum = math.fsum(
+            abs(rtts[i] - rtts[i - 1]) for i in range(1, self._count)
+        )
+
+    def percentile(self, percent: float) -> float | None:
+        """Return a percentile of the rtt window using the nearest rank."""
+        if not self._count:
+            return None
+        rank = max(math.ceil(percent / 100 * self._count), 1)
+        return self._sorted[rank - 1]
+
+    @property
+    def loss(self) -> float | None:
+        """Return the ratio of probes in the window that were lost."""
+        if not self._probes:
+            return None
+        return self._loss_count / self._probes
+
+    def summary(self) -> dict[str, float | int | None]:
+        """Return rolling statistics for the window."""
+        count = self._count
+        loss = self.loss
+        return {
+            ATTR_RTT_MIN: self._sorted[0] if count else None,
+            ATTR_RTT_MEAN: round(self._sum / count, 3) if count else None,
+            ATTR_RTT_MAX: self._sorted[-1] if count else None,
+            ATTR_RTT_P50: self.percentile(50),
+            ATTR_RTT_P95: self.percentile(95),
+            ATTR_RTT_P99: self.percentile(99),
+            ATTR_JITTER: (
+                round(self._jitter_sum / (count - 1), 3) if count > 1 else None
+            ),
+            ATTR_LOSS: round(loss, 4) if loss is not None else None,
+            ATTR_SAMPLES: count,
+        }
+
+
+class RttHourlyStats:
+    """
+    Hourly min, mean and max of probe rtts, for import as long-term statistics.
+
+    Samples are aggregated into the current hour. Completed hours are held
+    until they are collected. The current hour is also collected while it is
+    in progress, as statistics imported for an hour replace those previously
+    imported for the same hour.
+    """
+
+    def __init__(self) -> None:
+        self._hour: float | None = None
+        self._pending: list[tuple[float, float, float, float]] = []
+        self.last_mean: float | None = None
+        self._reset()
+
+    def _reset(self) -> None:
+        """Start a new hour."""
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+
+    def _current(self) -> tuple[float, float, float, float]:
+        """Return the start, mean, min and max of the current hour."""
+        return self._hour, self._sum / self._count, self._min, self._max
+
+    def _roll(self, now: float) -> None:
+        """Complete the current hour if now is in a later hour."""
+        hour = now - now % 3600
+        if hour == self._hour:
+            return
+        if self._count:
+            self._pending.append(self._current())
+            self.last_mean = round(self._sum / self._count, 3)
+        self._hour = hour
+        self._reset()
+
+    def add(self, rtt: float, now: float | None = None) -> None:
+        """Add a probe rtt."""
+        self._roll(time.time() if now is None else now)
+        self._count += 1
+        self._sum += rtt
+        if rtt < self._min:
+            self._min = rtt
+        if rtt > self._max:
+            self._max = rtt
+
+    def collect(
+        self, now: float | None = None
+    ) -> list[tuple[float, float, float, float]]:
+        """Return the start, mean, min and max of hours not yet collected."""
+        self._roll(time.time() if now is None else now)
+        hours, self._pending = self._pending, []
+        if self._count:
+            hours.append(self._current())
+        return hours
+
+    def to_dict(self) -> dict[str, float | int | None]:
+        """Return the aggregate of the current hour."""
+        return {
+            "hour": self._hour,
+            "count": self._count,
+            "sum": self._sum,
+            "min": self._min if self._count else None,
+            "max": self._max if self._count else None,
+            "last_mean": self.last_mean,
+        }
+
+    def restore(self, data: dict[str, float | int | None]) -> None:
+        """Restore the current hour from the output of to_dict()."""
+        self.last_mean = data.get("last_mean")
+        if data.get("count"):
+            self._hour = data["hour"]
+            self._count = data["count"]
+            self._sum = data["sum"]
+            self._min = data["min"]
+            self._max = data["max"]
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimator using the P-square algorithm.
+
+    The quantile is estimated from five markers that are adjusted as samples
+    arrive, so no samples are stored.
+    """
+
+    def __init__(self, quantile: float) -> None:
+        self.quantile = quantile
+        self._heights = [0.0] * 5
+        self._positions = [0] * 5
+        self._desired = [0.0] * 5
+        self._increments = [0.0, quantile / 2, quantile, (1 + quantile) / 2, 1.0]
+        self.count = 0
+
+    def reset(self) -> None:
+        """Discard all samples."""
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """Add a sample."""
+        heights = self._heights
+        positions = self._positions
+        desired = self._desired
+        if self.count < 5:
+            heights[self.count] = value
+            self.count += 1
+            if self.count == 5:
+                heights.sort()
+                quantile = self.quantile
+                positions[:] = range(5)
+                desired[:] = (0, 2 * quantile, 4 * quantile, 2 + 2 * quantile, 4)
+            return
+
+        self.count += 1
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            desired[i] += self._increments[i]
+
+        ## Adjust the heights of the middle markers
+        for i in range(1, 4):
+            delta = desired[i] - positions[i]
+            if (delta >= 1 and positions[i + 1] - positions[i] > 1) or (
+                delta <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                step = 1 if delta > 0 else -1
+                height = heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + step)
+                    * (heights[i + 1] - heights[i])
+                    / (positions[i + 1] - positions[i])
+                    + (positions[i + 1] - positions[i] - step)
+                    * (heights[i] - heights[i - 1])
+                    / (positions[i] - positions[i - 1])
+                )
+                if not heights[i - 1] < height < heights[i + 1]:
+                    ## Parabolic estimate out of order, use linear estimate
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i]
+                    )
+                heights[i] = height
+                positions[i] += step
+
+    @property
+    def value(self) -> float | None:
+        """Return the estimated quantile."""
+        if self.count >= 5:
+            return self._heights[2]
+        if not self.count:
+            return None
+        samples = sorted(self._heights[: self.count])
+        return samples[max(math.ceil(self.quantile * self.count), 1) - 1]
+
+
+class RttWindow:
+    """Streaming aggregate of all probe rtts within an update window."""
+
+    def __init__(self) -> None:
+        self._p95 = P2Quantile(0.95)
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new window."""
+        self.count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        self._p95.reset()
+
+    def add(self, rtt: float) -> None:
+        """Add a probe rtt to the window."""
+        self.count += 1
+        self._sum += rtt
+        if rtt < self._min:
+            self._min = rtt
+        if rtt > self._max:
+            self._max = rtt
+        self._p95.add(rtt)
+
+    def summary(self) -> dict[str, float | int | None]:
+        """Return aggregate statistics for the window."""
+        count = self.count
+        p95 = self._p95.value
+        return {
+            ATTR_WINDOW_MIN: self._min if count else None,
+            ATTR_WINDOW_MEAN: round(self._sum / count, 3) if count else None,
+            ATTR_WINDOW_MAX: self._max if count else None,
+            ATTR_WINDOW_P95: round(p95, 3) if p95 is not None else None,
+            ATTR_WINDOW_SAMPLES: count,
+        }
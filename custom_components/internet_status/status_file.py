@@ -0,0 +1,87 @@
+"""Status file shared by multiple Internet Status links."""
+
+from __future__ import annotations
+
+import json
+import logging
+
+from .file_reader import FileReader
+
+_LOGGER = logging.getLogger(__name__)
+
+STATUS_IP = "ip"
+STATUS_RTT = "rtt"
+
+LinkStatus = tuple[str | None, float | None]  ## (current IP, rtt)
+
+
+def parse_status_file(content: str) -> dict[str, LinkStatus]:
+    """
+    Parse the content of a status file.
+
+    JSON status files contain an object that maps each key to either an IP
+    address, or an object with "ip" and optionally "rtt" members. Entries
+    whose IP address is not a string are ignored, as are rtts that are not
+    numbers. Otherwise, each line contains key=ip, optionally followed by
+    whitespace and the rtt. Blank lines and lines beginning with # are
+    ignored.
+    """
+    statuses: dict[str, LinkStatus] = {}
+    content = content.strip()
+    if content.startswith("{"):
+        data = json.loads(content)
+        for key, value in data.items():
+            rtt = None
+            if isinstance(value, dict):
+                rtt = value.get(STATUS_RTT)
+                value = value.get(STATUS_IP)
+            if not isinstance(value, str):
+                _LOGGER.debug("ignoring status %s: invalid IP address", key)
+                continue
+            if not isinstance(rtt, (int, float)) or isinstance(rtt, bool):
+                rtt = None
+            statuses[key] = (value, float(rtt) if rtt is not None else None)
+        return statuses
+
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        fields = value.split()
+        statuses[key.strip()] = (
+            fields[0] if fields else None,
+            float(fields[1]) if len(fields) > 1 else None,
+        )
+    return statuses
+
+
+class StatusFile:
+    """
+    Status file with the current IP addresses of multiple links.
+
+    The file is only read and parsed when it has changed, so all links that
+    share the file are updated from a single read.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._reader = FileReader(path)
+        self._statuses: dict[str, LinkStatus] = {}
+
+    async def async_read(self) -> dict[str, LinkStatus]:
+        """Return the link statuses in the file."""
+        if (content := self._reader.read_if_changed()) is not None:
+            _LOGGER.debug("parsing status file %s", self.path)
+            try:
+                self._statuses = parse_status_file(content)
+            except ValueError:
+                self._reader.invalidate()  ## parse again on next read
+                raise
+        return self._statuses
+
+    def close(self) -> None:
+        """Close the status file."""
+        self._reader.close()